@@ -0,0 +1,64 @@
+"""Compare reading the WHATSAPP items of an export file, before and after.
+
+Before: every line is decoded, then filtered on its content type.
+After: `tap_gladly.jsonl.peek_content_type` skips the lines of other content
+types without decoding them.
+"""
+import argparse
+import tempfile
+import time
+from typing import Callable, Iterable, Iterator
+
+from tap_gladly.jsonl import decode_records, peek_content_type
+from tap_gladly.tests.synthetic import CONTENT_TYPE_MIX, write_conversation_items
+
+
+def before(lines: Iterable[bytes]) -> Iterator[dict]:
+    """Decode every line, keep the WHATSAPP items."""
+    for line in lines:
+        for record in decode_records(line):
+            if record["content"]["type"].lower() == "whatsapp":
+                yield record
+
+
+def after(lines: Iterable[bytes]) -> Iterator[dict]:
+    """Decode the WHATSAPP lines only."""
+    content_types = frozenset([b"whatsapp"])
+    for line in lines:
+        content_type = peek_content_type(line)
+        if content_type and content_type.lower() not in content_types:
+            continue
+        for record in decode_records(line):
+            if record["content"]["type"].lower() == "whatsapp":
+                yield record
+
+
+def measure(name: str, read: Callable, path: str, rows: int) -> int:
+    """Read the file and print the throughput, return the records kept."""
+    with open(path, "rb") as input_file:
+        start = time.perf_counter()
+        count = sum(1 for _ in read(line.rstrip(b"\n") for line in input_file))
+        elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {rows / elapsed:>12,.0f} rows/s ({elapsed:.1f}s)")
+    return count
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".jsonl") as items_file:
+        rows = write_conversation_items(items_file, args.size_mb * 1024 * 1024)
+        items_file.flush()
+        print(
+            f"conversation_items.jsonl: {args.size_mb} MB, {rows:,} rows, "
+            f"{CONTENT_TYPE_MIX['WHATSAPP']:.0%} WHATSAPP"
+        )
+        kept = measure("before", before, items_file.name, rows)
+        assert measure("after", after, items_file.name, rows) == kept
+
+
+if __name__ == "__main__":
+    main()
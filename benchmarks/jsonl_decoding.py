@@ -0,0 +1,49 @@
+"""Compare the JSON Lines decoding of export files, before and after.
+
+Before: `json.loads` and `extract_jsonpath("$[*]", ...)` on every line.
+After: `tap_gladly.jsonl.iter_jsonl_records`, using orjson when installed.
+"""
+import argparse
+import json
+import tempfile
+import time
+from typing import Callable, Iterable, Iterator
+
+from singer_sdk.helpers.jsonpath import extract_jsonpath
+
+from tap_gladly.jsonl import iter_jsonl_records
+from tap_gladly.tests.synthetic import write_conversation_items
+
+
+def before(lines: Iterable[bytes]) -> Iterator[dict]:
+    """Decode lines the way the streams used to."""
+    for line in lines:
+        yield from extract_jsonpath("$[*]", input=json.loads(line))
+
+
+def measure(name: str, decode: Callable, path: str, rows: int) -> None:
+    """Decode the file and print the decoding throughput."""
+    with open(path, "rb") as input_file:
+        start = time.perf_counter()
+        count = sum(1 for _ in decode(line.rstrip(b"\n") for line in input_file))
+        elapsed = time.perf_counter() - start
+    assert count == rows
+    print(f"{name:>8}: {rows / elapsed:>12,.0f} rows/s ({elapsed:.1f}s)")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".jsonl") as items_file:
+        rows = write_conversation_items(items_file, args.size_mb * 1024 * 1024)
+        items_file.flush()
+        print(f"conversation_items.jsonl: {args.size_mb} MB, {rows:,} rows")
+        measure("before", before, items_file.name, rows)
+        measure("after", iter_jsonl_records, items_file.name, rows)
+
+
+if __name__ == "__main__":
+    main()
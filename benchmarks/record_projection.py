@@ -0,0 +1,81 @@
+"""Compare the record selection and conformance of the email and chat streams.
+
+Before: the SDK `pop_deselected_record_properties` and
+`conform_record_data_types`, walking the schema on every record.
+After: `gladlyStream.project_record`, compiled once per stream.
+
+The email body is deselected, as it is by taps only interested in metadata.
+"""
+import argparse
+import time
+from typing import Callable, List
+
+import pendulum
+from singer_sdk.helpers._catalog import pop_deselected_record_properties
+from singer_sdk.helpers._typing import conform_record_data_types
+
+from tap_gladly.client import gladlyStream
+from tap_gladly.streams import (
+    ExportFileConversationItemsChatMessage,
+    ExportFileConversationItemsEmail,
+)
+from tap_gladly.tap import Tapgladly
+from tap_gladly.tests.synthetic import conversation_item
+
+
+def before(stream: gladlyStream) -> Callable[[dict], dict]:
+    """Return the SDK processing of a record."""
+
+    def process(record: dict) -> dict:
+        pop_deselected_record_properties(
+            record, stream.schema, stream.mask, stream.logger
+        )
+        return conform_record_data_types(
+            stream.name, record, stream.schema, stream.logger
+        )
+
+    return process
+
+
+def measure(name: str, process: Callable[[dict], dict], rows: List[dict]) -> None:
+    """Process the rows and print the throughput."""
+    start = time.perf_counter()
+    for row in rows:
+        process(row)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>34}: {len(rows) / elapsed:>12,.0f} rows/s ({elapsed:.2f}s)")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    tap = Tapgladly(
+        config={
+            "start_date": pendulum.now().isoformat(),
+            "username": "username",
+            "password": "password",
+            "api_url_base": "https://example.gladly.com",
+        },
+        parse_env_config=False,
+    )
+    email_stream = ExportFileConversationItemsEmail(tap)
+    email_stream.metadata[
+        ("properties", "content", "properties", "content")
+    ].selected = False
+    chat_stream = ExportFileConversationItemsChatMessage(tap)
+
+    for stream, content_type in (
+        (email_stream, "EMAIL"),
+        (chat_stream, "CHAT_MESSAGE"),
+    ):
+        rows = [conversation_item(index, content_type) for index in range(args.rows)]
+        measure(f"{stream.name} before", before(stream), rows)
+        rows = [conversation_item(index, content_type) for index in range(args.rows)]
+        measure(f"{stream.name} after", stream.project_record, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare the parsing of a large conversation timestamps report, before and after.
+
+Before: the body loaded in memory, `iter_lines` and `csv.DictReader`.
+After: `tap_gladly.csv_reports.iter_csv_records` reading the body as it comes.
+
+Each variant runs in a forked process, so its peak RSS is its own.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+from multiprocessing.connection import Connection
+from typing import Iterator
+
+import requests
+
+from tap_gladly.client import SCHEMAS_DIR
+from tap_gladly.csv_reports import iter_csv_records
+from tap_gladly.streams import ReportsConversationTimestampsReportStream
+from tap_gladly.tests.synthetic import write_report
+
+SCHEMA = SCHEMAS_DIR / ReportsConversationTimestampsReportStream.schema_file
+
+
+def before(path: str) -> Iterator[dict]:
+    """Parse the report the way the stream used to, without streaming."""
+    response = requests.Response()
+    with open(path, "rb") as body:
+        response._content = body.read()
+    response._content_consumed = True
+    gen_decoded_response = (line.decode("utf-8") for line in response.iter_lines())
+    yield from csv.DictReader(gen_decoded_response)
+
+
+def after(path: str) -> Iterator[dict]:
+    """Parse the report while reading it."""
+    with open(SCHEMA) as schema_file:
+        schema = json.load(schema_file)
+    with open(path, "rb") as body:
+        yield from iter_csv_records(body, schema)
+
+
+def measure(name: str, path: str, connection: Connection) -> None:
+    """Parse the report, send the row count, duration and peak RSS."""
+    parse = {"before": before, "after": after}[name]
+    start = time.perf_counter()
+    rows = sum(1 for _ in parse(path))
+    elapsed = time.perf_counter() - start
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    connection.send((rows, elapsed, peak_rss_kb))
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".csv") as report_file:
+        write_report(report_file, args.rows)
+        report_file.flush()
+        print(f"report.csv: {report_file.tell() / 1024 / 1024:.0f} MB")
+        for name in ("before", "after"):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.get_context("fork").Process(
+                target=measure, args=(name, report_file.name, sender)
+            )
+            process.start()
+            sender.close()
+            rows, elapsed, peak_rss_kb = receiver.recv()
+            process.join()
+            assert rows == args.rows
+            print(
+                f"{name:>8}: {rows / elapsed:>12,.0f} rows/s ({elapsed:.1f}s), "
+                f"peak RSS {peak_rss_kb / 1024:,.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Throughput of a full `Tapgladly` sync of each stream, against the mock API.
+
+Run with `poetry run pytest benchmarks`. The size of the served files is set
+with the GLADLY_BENCHMARK_JOBS and GLADLY_BENCHMARK_MB environment variables.
+Each sync runs in a forked process, so its peak RSS is its own.
+"""
+import multiprocessing
+import os
+import resource
+import time
+from multiprocessing.connection import Connection
+from typing import Iterator, Tuple
+
+import pendulum
+import pytest
+
+from tap_gladly.tap import Tapgladly
+from tap_gladly.tests.catalog import selected_catalog
+from tap_gladly.tests.mock_server import MockGladlyServer
+
+STREAMS = [
+    "topics",
+    "conversation_chat_message",
+    "conversation_email",
+    "conversation_whatsapp",
+    "conversation_all_types",
+    "reports__conversation_timestamps_report",
+]
+
+
+@pytest.fixture(scope="module")
+def server() -> Iterator[MockGladlyServer]:
+    """Serve the synthetic export files for all the benchmarks."""
+    with MockGladlyServer(
+        jobs=int(os.environ.get("GLADLY_BENCHMARK_JOBS", 2)),
+        conversation_items_mb=float(os.environ.get("GLADLY_BENCHMARK_MB", 8)),
+        topics=10_000,
+        report_rows=20_000,
+    ) as server:
+        yield server
+
+
+def sync(config: dict, stream_name: str, connection: Connection) -> None:
+    """Sync the stream, send its row count, duration and peak RSS."""
+    tap = Tapgladly(
+        config=config,
+        catalog=selected_catalog(config, stream_name),
+        parse_env_config=False,
+    )
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        start = time.perf_counter()
+        tap.sync_all()
+        elapsed = time.perf_counter() - start
+    summary = tap.metrics.summary()["streams"][stream_name]["total"]
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    connection.send((summary["emitted_rows"], elapsed, peak_rss_kb))
+
+
+def sync_in_child(config: dict, stream_name: str) -> Tuple[int, float, int]:
+    """Run `sync` in a forked process and return its results."""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.get_context("fork").Process(
+        target=sync, args=(config, stream_name, sender)
+    )
+    process.start()
+    sender.close()
+    results = receiver.recv()
+    process.join()
+    assert process.exitcode == 0
+    return results
+
+
+def benchmark_config(server: MockGladlyServer) -> dict:
+    """Return the tap config syncing all the jobs of the server."""
+    return {
+        "start_date": pendulum.now().subtract(days=server.jobs + 1).isoformat(),
+        "username": "username",
+        "password": "password",
+        "api_url_base": server.url,
+        "max_parallel_jobs": 2,
+        "report_window_days": 1,
+    }
+
+
+@pytest.mark.parametrize("stream_name", STREAMS)
+def test_sync(benchmark, server: MockGladlyServer, stream_name: str) -> None:
+    """Benchmark the sync of a stream."""
+    run_benchmark(benchmark, benchmark_config(server), stream_name)
+
+
+@pytest.mark.parametrize("encoding", ["jsonl", "parquet"])
+@pytest.mark.parametrize(
+    "stream_name", ["conversation_email", "conversation_all_types"]
+)
+def test_batch_sync(
+    benchmark, server: MockGladlyServer, tmp_path, stream_name: str, encoding: str
+) -> None:
+    """Benchmark the sync of a stream to batch files."""
+    if encoding == "parquet":
+        pytest.importorskip("pyarrow")
+    config = dict(
+        benchmark_config(server),
+        batch_config={
+            "encoding": {
+                "format": encoding,
+                "compression": "gzip" if encoding == "jsonl" else "snappy",
+            },
+            "storage": {"root": tmp_path.as_uri()},
+        },
+    )
+    run_benchmark(benchmark, config, stream_name)
+
+
+def run_benchmark(benchmark, config: dict, stream_name: str) -> None:
+    """Benchmark the sync of a stream, record its rows per second and peak RSS."""
+    results = []
+    benchmark.pedantic(
+        lambda: results.append(sync_in_child(config, stream_name)), rounds=3
+    )
+    rows, elapsed, peak_rss_kb = results[-1]
+    assert rows > 0
+    benchmark.extra_info["rows"] = rows
+    benchmark.extra_info["rows_per_second"] = round(rows / elapsed)
+    benchmark.extra_info["peak_rss_mb"] = round(peak_rss_kb / 1024, 1)
+    encoding = config.get("batch_config", {}).get("encoding", {})
+    output = f" ({encoding['format']} batches)" if encoding else ""
+    print(
+        f"\n{stream_name}{output}: {rows:,} rows, {rows / elapsed:,.0f} rows/s, "
+        f"{elapsed:.2f}s, peak RSS {peak_rss_kb / 1024:.0f} MB"
+    )
@@ -0,0 +1,62 @@
+"""Compare filtering export jobs on their updatedAt, before and after.
+
+Before: `pendulum.parse` of the job date, start_date and end_date per job.
+After: `tap_gladly.timewindow.TimeWindow`, bounds parsed once.
+"""
+import argparse
+import time
+from typing import Callable, List
+
+import pendulum
+
+from tap_gladly.timewindow import TimeWindow
+
+CONFIG = {
+    "start_date": pendulum.now("UTC").subtract(days=365).isoformat(),
+    "end_date": pendulum.now("UTC").subtract(days=30).isoformat(),
+}
+
+
+def before(jobs: List[dict]) -> int:
+    """Filter the jobs the way the jobs stream used to."""
+    kept = 0
+    for job in jobs:
+        job_completion_date = pendulum.parse(job["updatedAt"])
+        if pendulum.parse(CONFIG["start_date"]) <= job_completion_date:
+            if pendulum.parse(CONFIG["end_date"]) >= job_completion_date:
+                kept += 1
+    return kept
+
+
+def after(jobs: List[dict]) -> int:
+    """Filter the jobs on a window parsed once."""
+    window = TimeWindow.parse(CONFIG["start_date"], CONFIG["end_date"])
+    return sum(1 for job in jobs if job["updatedAt"] in window)
+
+
+def measure(name: str, filter_jobs: Callable[[List[dict]], int], jobs: list) -> int:
+    """Filter the jobs and print the throughput, return the jobs kept."""
+    start = time.perf_counter()
+    kept = filter_jobs(jobs)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {len(jobs) / elapsed:>12,.0f} jobs/s ({elapsed:.2f}s)")
+    return kept
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=100_000)
+    args = parser.parse_args()
+
+    now = pendulum.now("UTC")
+    jobs = [
+        {"updatedAt": now.subtract(minutes=index * 7).isoformat()}
+        for index in range(args.jobs)
+    ]
+    kept = measure("before", before, jobs)
+    assert measure("after", after, jobs) == kept
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Gladly accounts synced by the tap, each with its own API and credentials."""
+from dataclasses import dataclass
+from typing import List, Mapping, Optional
+
+from singer_sdk import exceptions
+
+# Schema of the property tagging the records with their account
+ACCOUNT_PROPERTY_SCHEMA = {"type": ["string", "null"]}
+
+
+@dataclass(frozen=True)
+class Account:
+    """Gladly account, synced with the API at `api_url_base`."""
+
+    name: str
+    api_url_base: str
+    username: str
+    password: str
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> Optional[List["Account"]]:
+        """Return the accounts of the accounts setting, None if not set.
+
+        Settings missing from an account default to the top-level ones.
+        """
+        if "accounts" not in config:
+            return None
+        accounts = [
+            cls(
+                name=account["name"],
+                api_url_base=account.get("api_url_base", config["api_url_base"]),
+                username=account.get("username", config["username"]),
+                password=account.get("password", config["password"]),
+            )
+            for account in config["accounts"]
+        ]
+        names = [account.name for account in accounts]
+        if not names or len(set(names)) != len(names):
+            raise exceptions.ConfigValidationError(
+                f"accounts must have distinct names, got {names}"
+            )
+        if "follow_interval" in config:
+            raise exceptions.ConfigValidationError(
+                "follow_interval is not supported with several accounts"
+            )
+        return accounts
+
+
+def account_context(context: Optional[dict]) -> Optional[dict]:
+    """Return the account partition of a context, None if it has no account."""
+    if not context or "account" not in context:
+        return None
+    return {"account": context["account"]}
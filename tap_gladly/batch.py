@@ -0,0 +1,305 @@
+"""Batch output of the records, written to local files announced by BATCH messages."""
+import abc
+import gzip
+import json
+import sys
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from singer_sdk import exceptions
+
+# pyarrow is only needed to write Parquet files
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+Converter = Callable[[Any], Any]
+
+FORMATS = ("jsonl", "parquet")
+COMPRESSIONS = {"jsonl": ("gzip", "none"), "parquet": ("gzip", "snappy", "none")}
+
+# Arrow type of the JSON schema scalar types
+ARROW_TYPES = {
+    "string": "string",
+    "integer": "int64",
+    "number": "float64",
+    "boolean": "bool_",
+}
+
+# Rows converted to an Arrow record batch at once, written as a row group
+ROW_GROUP_SIZE = 10_000
+
+
+@dataclass
+class BatchConfig:
+    """Encoding and local storage of the batch files."""
+
+    format: str = "jsonl"
+    compression: str = "gzip"
+    root: Path = Path(".")
+    prefix: str = ""
+    batch_size: int = 100_000
+
+    @classmethod
+    def from_config(cls, batch_config: dict) -> "BatchConfig":
+        """Return the batch config of the tap batch_config setting.
+
+        Only local file:// roots are supported.
+        """
+        encoding = batch_config.get("encoding", {})
+        storage = batch_config.get("storage", {})
+        config = cls(
+            format=encoding.get("format", "jsonl"),
+            compression=encoding.get("compression", "gzip"),
+            prefix=storage.get("prefix", ""),
+            batch_size=batch_config.get("batch_size", cls.batch_size),
+        )
+        if config.format not in FORMATS:
+            raise exceptions.ConfigValidationError(
+                f"Unsupported batch format '{config.format}', expected one of {FORMATS}"
+            )
+        if config.compression not in COMPRESSIONS[config.format]:
+            raise exceptions.ConfigValidationError(
+                f"Unsupported {config.format} batch compression "
+                f"'{config.compression}', expected one of "
+                f"{COMPRESSIONS[config.format]}"
+            )
+        if config.format == "parquet" and pa is None:
+            raise exceptions.ConfigValidationError(
+                'Parquet batches require pyarrow, install "tap-gladly[parquet]"'
+            )
+        root = urlparse(storage.get("root", "file://."))
+        if root.scheme != "file":
+            raise exceptions.ConfigValidationError(
+                f"Unsupported batch storage root '{storage['root']}', "
+                "only file:// roots are supported"
+            )
+        config.root = Path(root.netloc + root.path)
+        return config
+
+    @property
+    def encoding(self) -> dict:
+        """Return the encoding of the BATCH messages."""
+        return {"format": self.format, "compression": self.compression}
+
+    @property
+    def suffix(self) -> str:
+        """Return the suffix of the batch file names."""
+        suffix = f".{self.format}"
+        if self.format == "jsonl" and self.compression == "gzip":
+            suffix += ".gz"
+        return suffix
+
+
+class BatchFile(abc.ABC):
+    """Abstract class, batch file of a stream, written as records are added."""
+
+    def __init__(self, path: Path, config: BatchConfig, schema: dict) -> None:
+        """Open the file at `path`."""
+        self.path = path
+        self.rows = 0
+
+    @abc.abstractmethod
+    def write(self, record: dict) -> None:
+        """Write a record to the file."""
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        """Write the pending records and close the file."""
+
+
+class JSONLBatchFile(BatchFile):
+    """JSON Lines batch file, compressed with gzip or not."""
+
+    def __init__(self, path: Path, config: BatchConfig, schema: dict) -> None:
+        """Open the file at `path`."""
+        super().__init__(path, config, schema)
+        self.file: IO[str]
+        if config.compression == "gzip":
+            self.file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+        else:
+            self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, record: dict) -> None:
+        """Write a record to the file."""
+        self.file.write(json.dumps(record, default=str))
+        self.file.write("\n")
+        self.rows += 1
+
+    def close(self) -> None:
+        """Close the file."""
+        self.file.close()
+
+
+class ParquetBatchFile(BatchFile):
+    """Parquet batch file, typed from the stream schema.
+
+    Records are converted to Arrow record batches of ROW_GROUP_SIZE rows.
+    """
+
+    def __init__(self, path: Path, config: BatchConfig, schema: dict) -> None:
+        """Open the file at `path`."""
+        super().__init__(path, config, schema)
+        self.arrow_schema, self.convert = arrow_schema(schema)
+        self.writer = pq.ParquetWriter(
+            str(path), self.arrow_schema, compression=config.compression
+        )
+        self.pending: List[dict] = []
+
+    def write(self, record: dict) -> None:
+        """Add a record to the next record batch."""
+        self.pending.append(self.convert(record))
+        self.rows += 1
+        if len(self.pending) >= ROW_GROUP_SIZE:
+            self.write_record_batch()
+
+    def write_record_batch(self) -> None:
+        """Write the pending records as a record batch."""
+        self.writer.write_batch(
+            pa.RecordBatch.from_pylist(self.pending, schema=self.arrow_schema)
+        )
+        self.pending = []
+
+    def close(self) -> None:
+        """Write the pending records and close the file."""
+        if self.pending:
+            self.write_record_batch()
+        self.writer.close()
+
+
+def arrow_schema(schema: dict) -> Tuple[Any, Converter]:
+    """Return the Arrow schema of a JSON schema, and the record converter.
+
+    Properties without a single JSON type are written as JSON strings.
+    """
+    struct_type, convert = _arrow_struct(schema.get("properties", {}))
+    return (
+        pa.schema(
+            [struct_type.field(index) for index in range(struct_type.num_fields)]
+        ),
+        convert,
+    )
+
+
+def _to_json(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, default=str)
+
+
+def _arrow_type(schema: dict) -> Tuple[Any, Converter]:
+    types = schema.get("type", [])
+    if isinstance(types, str):
+        types = [types]
+    types = [json_type for json_type in types if json_type != "null"]
+    if len(types) != 1:
+        return pa.string(), _to_json
+    json_type = types[0]
+    if json_type in ARROW_TYPES:
+        return getattr(pa, ARROW_TYPES[json_type])(), _identity
+    if json_type == "object" and schema.get("properties"):
+        return _arrow_struct(schema["properties"])
+    if json_type == "array" and "items" in schema:
+        return _arrow_list(schema["items"])
+    return pa.string(), _to_json
+
+
+def _arrow_list(items: dict) -> Tuple[Any, Converter]:
+    item_type, convert_item = _arrow_type(items)
+    if convert_item is _identity:
+        return pa.list_(item_type), _identity
+
+    def convert_items(value: Any) -> Any:
+        if value is None:
+            return None
+        return [convert_item(item) for item in value]
+
+    return pa.list_(item_type), convert_items
+
+
+def _arrow_struct(properties: dict) -> Tuple[Any, Converter]:
+    fields = []
+    converters: Dict[str, Converter] = {}
+    for name, property_schema in properties.items():
+        arrow_type, convert = _arrow_type(property_schema)
+        fields.append(pa.field(name, arrow_type))
+        if convert is not _identity:
+            converters[name] = convert
+
+    def convert_struct(value: Any) -> Any:
+        if value is None or not converters:
+            return value
+        value = dict(value)
+        for name, convert in converters.items():
+            value[name] = convert(value.get(name))
+        return value
+
+    return pa.struct(fields), convert_struct
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+BATCH_FILE_TYPES = {"jsonl": JSONLBatchFile, "parquet": ParquetBatchFile}
+
+
+class BatchWriter:
+    """Batch files of the streams, announced by BATCH messages once closed.
+
+    The files are closed once one of them has batch_size records, or when
+    `flush` is called. STATE messages are held while files are open, then
+    written once they are closed, so that the state never checkpoints records
+    the target has not received.
+    """
+
+    def __init__(self, config: BatchConfig, write_state: Callable[[], None]) -> None:
+        """Write batch files as set by `config`, and the state with `write_state`."""
+        self.config = config
+        self.write_state = write_state
+        self.files: Dict[str, BatchFile] = {}
+        self.state_pending = False
+        self.config.root.mkdir(parents=True, exist_ok=True)
+
+    def write(self, stream: str, schema: dict, record: dict) -> None:
+        """Add a record of `stream` to its batch file."""
+        batch_file = self.files.get(stream)
+        if batch_file is None:
+            name = f"{self.config.prefix}{stream}-{uuid.uuid4().hex}"
+            batch_file = BATCH_FILE_TYPES[self.config.format](
+                self.config.root / f"{name}{self.config.suffix}", self.config, schema
+            )
+            self.files[stream] = batch_file
+        batch_file.write(record)
+        if batch_file.rows >= self.config.batch_size:
+            self.flush()
+
+    def hold_state(self) -> bool:
+        """Return True if the state must be written once the files are closed."""
+        if not self.files:
+            return False
+        self.state_pending = True
+        return True
+
+    def flush(self) -> None:
+        """Close the files, write their BATCH messages, then the held state."""
+        for stream, batch_file in self.files.items():
+            batch_file.close()
+            message = {
+                "type": "BATCH",
+                "stream": stream,
+                "encoding": self.config.encoding,
+                "manifest": [batch_file.path.resolve().as_uri()],
+            }
+            sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+        self.files = {}
+        if self.state_pending:
+            self.state_pending = False
+            self.write_state()
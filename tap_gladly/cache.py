@@ -0,0 +1,178 @@
+"""Local cache of export job files."""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from tap_gladly.timewindow import DAY, now_epoch
+
+TEMPORARY_SUFFIX = ".tmp"
+# Metadata of a cached file, next to it
+METADATA_SUFFIX = ".json"
+
+
+class ExportFileCache:
+    """Content addressed directory of export job files.
+
+    Files of COMPLETED jobs never change, so they are kept on disk once
+    downloaded and read back on later runs instead of calling the API. Files
+    are evicted once their job completed more than `max_age_days` ago, then
+    the first downloaded once the directory is larger than `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: Optional[int] = None,
+        max_age_days: Optional[int] = None,
+    ) -> None:
+        """Create the cache directory if needed."""
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, job_id: str, file_name: str) -> Path:
+        """Return the cache path of a job file."""
+        key = hashlib.sha256(f"{job_id}/{file_name}".encode()).hexdigest()
+        return self.directory / key
+
+    def read_lines(
+        self, job_id: str, file_name: str, offset: int = 0
+    ) -> Optional[Iterator[bytes]]:
+        """Return the lines of a cached job file from byte `offset`.
+
+        Return None if the file is not cached.
+        """
+        path = self.path(job_id, file_name)
+        if not path.is_file():
+            return None
+        logging.info(f"Reading {file_name} of job id {job_id} from {path}")
+        return self._read_lines(path, offset)
+
+    def write_lines(
+        self,
+        job_id: str,
+        file_name: str,
+        lines: Iterable[bytes],
+        updated_at: Optional[int] = None,
+    ) -> Iterator[bytes]:
+        """Return the lines while writing them to the cache.
+
+        The file is only added to the cache once all the lines were read.
+        `updated_at` is the epoch microseconds at which the job completed, the
+        file age is the one of its download if not set.
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, suffix=TEMPORARY_SUFFIX
+        )
+        path = self.path(job_id, file_name)
+        try:
+            with os.fdopen(file_descriptor, "wb") as cache_file:
+                for line in lines:
+                    cache_file.write(line)
+                    cache_file.write(b"\n")
+                    yield line
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        if updated_at is not None:
+            self._write_metadata(path, {"updated_at": updated_at})
+        self.evict()
+
+    @staticmethod
+    def metadata_path(path: Path) -> Path:
+        """Return the path of the metadata of a cached file."""
+        return path.with_name(path.name + METADATA_SUFFIX)
+
+    def _write_metadata(self, path: Path, metadata: dict) -> None:
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, suffix=TEMPORARY_SUFFIX
+        )
+        try:
+            with os.fdopen(file_descriptor, "w") as metadata_file:
+                json.dump(metadata, metadata_file)
+            os.replace(temporary_path, self.metadata_path(path))
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _read_updated_at(self, path: Path) -> Optional[int]:
+        try:
+            with open(self.metadata_path(path)) as metadata_file:
+                return json.load(metadata_file)["updated_at"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def evict(self) -> None:
+        """Remove the files of too old jobs, then the oldest above max_bytes.
+
+        The age of a file is the one of its job, or of its download if the
+        job completion time is unknown.
+        """
+        files = self._list_files()
+        files.sort(key=lambda stat_path: stat_path[0].st_mtime)
+
+        if self.max_age_days is not None:
+            # Same as max_job_lookback, which keeps jobs less than n + 1 days old
+            expired_at = now_epoch() - (self.max_age_days + 1) * DAY
+            expired = set()
+            for stat, path in files:
+                updated_at = self._read_updated_at(path)
+                if updated_at is None:
+                    updated_at = int(stat.st_mtime * 1_000_000)
+                if updated_at < expired_at:
+                    self._remove(path)
+                    expired.add(path)
+            files = [(stat, path) for stat, path in files if path not in expired]
+
+        if self.max_bytes is not None:
+            files = [
+                (stat, path)
+                for stat, path in files
+                if not path.name.endswith(TEMPORARY_SUFFIX)
+            ]
+            total_bytes = sum(stat.st_size for stat, _ in files)
+            for stat, path in files:
+                if total_bytes <= self.max_bytes:
+                    break
+                self._remove(path)
+                total_bytes -= stat.st_size
+
+    def _list_files(self) -> List[Tuple[os.stat_result, Path]]:
+        files = []
+        for path in self.directory.iterdir():
+            if path.name.endswith(METADATA_SUFFIX):
+                if not path.with_name(path.name[: -len(METADATA_SUFFIX)]).exists():
+                    # Metadata of a file evicted by another process
+                    self._remove(path)
+                continue
+            try:
+                files.append((path.stat(), path))
+            except FileNotFoundError:
+                continue
+        return files
+
+    @staticmethod
+    def _read_lines(path: Path, offset: int = 0) -> Iterator[bytes]:
+        with open(path, "rb") as cache_file:
+            if os.fstat(cache_file.fileno()).st_size <= offset:
+                return
+            with mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ) as lines:
+                lines.seek(offset)
+                for line in iter(lines.readline, b""):
+                    yield line.rstrip(b"\n")
+
+    @classmethod
+    def _remove(cls, path: Path) -> None:
+        logging.info(f"Evicting {path} from the export file cache")
+        for removed in (path, cls.metadata_path(path)):
+            try:
+                os.remove(removed)
+            except FileNotFoundError:
+                pass
@@ -1,15 +1,53 @@
 """REST client handling, including gladlyStream base class."""
+import contextlib
+import copy
+import functools
+import json
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Tuple,
+    cast,
+)
 
 import requests
+from singer import RecordMessage
 from singer_sdk.authenticators import BasicAuthenticator
 from singer_sdk.helpers.jsonpath import extract_jsonpath
+from singer_sdk.mapper import StreamMap
+from singer_sdk.plugin_base import PluginBase as TapBaseClass
 from singer_sdk.streams import RESTStream
 
+from tap_gladly.accounts import ACCOUNT_PROPERTY_SCHEMA
+from tap_gladly.metrics import StreamMetrics
+from tap_gladly.projection import compile_projection
+from tap_gladly.scheduler import LOW_PRIORITY
+
+if TYPE_CHECKING:
+    from tap_gladly.tap import Tapgladly
+
 SCHEMAS_DIR = Path(__file__).parent / Path("./schemas")
 
 
+@functools.lru_cache(maxsize=None)
+def load_schema(file_name: str) -> dict:
+    """Return the schema of a file of the schemas directory, parsed once.
+
+    The schema is shared by all the streams using it, it must not be modified.
+    """
+    return json.loads((SCHEMAS_DIR / file_name).read_text())
+
+
 class gladlyStream(RESTStream):
     """gladly stream class."""
 
@@ -19,17 +57,254 @@ class gladlyStream(RESTStream):
         """Return the API URL root, configurable via tap settings."""
         return self.config["api_url_base"]
 
+    @property
+    def tap(self) -> "Tapgladly":
+        """Return the tap the stream belongs to."""
+        return cast("Tapgladly", self._tap)
+
+    _projection: Optional[Callable[[dict], dict]] = None
+
+    # Schema file of the stream, in the schemas directory
+    schema_file: Optional[str] = None
+
+    def __init__(
+        self,
+        tap: TapBaseClass,
+        name: Optional[str] = None,
+        schema: Optional[dict] = None,
+        path: Optional[str] = None,
+    ) -> None:
+        """Initialize the stream, with the schema of its schema file.
+
+        Stream maps modify the properties of the stream schema in place, the
+        schema is copied from the shared one if there are any.
+        """
+        if schema is None and self.schema_file:
+            schema = self.extend_schema(load_schema(self.schema_file), tap.config)
+            if tap.config.get("stream_maps"):
+                schema = copy.deepcopy(schema)
+        super().__init__(tap, name=name, schema=schema, path=path)
+
+    @classmethod
+    def extend_schema(cls, schema: dict, config: Mapping[str, Any]) -> dict:
+        """Return the stream schema of the schema file, with the account if set.
+
+        The schema of the file is shared, the extended schema must be a copy.
+        """
+        if "accounts" not in config:
+            return schema
+        properties = dict(schema["properties"], account=ACCOUNT_PROPERTY_SCHEMA)
+        return dict(schema, properties=properties)
+
+    # Priority of the stream requests in the tap request scheduler
+    request_priority = LOW_PRIORITY
+
+    # Throttled requests are sent again once the scheduler pause is over
+    MAX_THROTTLED_ATTEMPTS = 10
+
     records_jsonpath = "$[*]"  # Or override `parse_response`.
     next_page_token_jsonpath = "$.next_page"  # Or override `get_next_page_token`.
 
+    def metrics(self, context: Optional[dict]) -> StreamMetrics:
+        """Return the stream metrics of the job in context, or of the stream."""
+        job_id = context.get("job_id") if context else None
+        return self.tap.metrics.get(self.name, job_id)
+
+    def download_metrics(self, context: Optional[dict]) -> StreamMetrics:
+        """Return the metrics where the requests and downloads are recorded."""
+        return self.metrics(context)
+
+    @property
+    def project_record(self) -> Callable[[dict], dict]:
+        """Return the record projection on the schema and selected properties."""
+        if self._projection is None:
+            self._projection = compile_projection(self.schema, self.mask, self.logger)
+        return self._projection
+
+    def _generate_record_messages(
+        self, record: dict
+    ) -> Generator[RecordMessage, None, None]:
+        """Return the record messages, projecting the record on the schema.
+
+        Replaces the SDK generic selection and conformance of every record,
+        which walks the schema and the whole record each time.
+        """
+        for stream_map, mapped_record in self.map_record(record):
+            yield RecordMessage(
+                stream=stream_map.stream_alias,
+                record=mapped_record,
+                version=None,
+                time_extracted=datetime.now(timezone.utc),
+            )
+
+    def map_record(self, record: dict) -> Iterator[Tuple[StreamMap, dict]]:
+        """Return the stream maps and records of the record, projected on the schema.
+
+        Records filtered out by a stream map are not returned.
+        """
+        record = self.project_record(record)
+        for stream_map in self.stream_maps:
+            mapped_record = stream_map.transform(record)
+            if mapped_record is not None:
+                yield stream_map, mapped_record
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return the processed records, counting those filtered out."""
+        metrics = self.metrics(context)
+        for record in self.request_records(context):
+            transformed_record = self.post_process(record, context)
+            if transformed_record is None:
+                metrics.filtered_rows += 1
+                continue
+            transformed_record = self.tag_record(transformed_record, context)
+            if self.is_duplicate(transformed_record):
+                metrics.duplicate_rows += 1
+                continue
+            yield transformed_record
+
+    def tag_record(self, record: dict, context: Optional[dict]) -> dict:
+        """Return the record tagged with the account of the context, if any.
+
+        Records may be shared by several streams, the tagged record is a copy.
+        """
+        if not context or "account" not in context:
+            return record
+        return dict(record, account=context["account"])
+
+    def get_url(self, context: Optional[dict]) -> str:
+        """Return the URL of the request, on the API of the account in context."""
+        url = super().get_url(context)
+        account = self.tap.account(context)
+        if account is None:
+            return url
+        return url.replace(self.url_base, account.api_url_base, 1)
+
+    def prepare_request(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> requests.PreparedRequest:
+        """Return the request, with the credentials of the account in context."""
+        prepared_request = super().prepare_request(context, next_page_token)
+        account = self.tap.account(context)
+        if account is not None:
+            prepared_request.prepare_auth((account.username, account.password))
+        return prepared_request
+
+    def is_duplicate(self, record: dict) -> bool:
+        """Return True if the record was already emitted, never by default."""
+        return False
+
+    def _request(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        """Send the request, streaming the response instead of loading it at once.
+
+        Job files and reports can be several GB large, they are parsed as they
+        are downloaded. Requests wait for the tap request scheduler, throttled
+        requests are sent again when the API accepts requests again, instead
+        of the exponential backoff of the other retriable errors.
+        """
+        scheduler = self.tap.scheduler
+        for attempt in range(1, self.MAX_THROTTLED_ATTEMPTS + 1):
+            with scheduler.request(self.request_priority):
+                response = self.requests_session.send(
+                    prepared_request, stream=True, timeout=self.timeout
+                )
+            scheduler.record_response(response)
+            if response.status_code != 429 or attempt == self.MAX_THROTTLED_ATTEMPTS:
+                break
+            response.close()
+        if self._LOG_REQUEST_METRICS:
+            extra_tags = {}
+            if self._LOG_REQUEST_METRIC_URLS:
+                extra_tags["url"] = prepared_request.path_url
+            self._write_request_duration_log(
+                endpoint=self.path,
+                response=response,
+                context=context,
+                extra_tags=extra_tags,
+            )
+        try:
+            self.validate_response(response)
+        except Exception:
+            # The streamed body is not read, release the connection to the pool
+            response.close()
+            raise
+        return response
+
+    def profile(self, name: Optional[str] = None) -> ContextManager[None]:
+        """Return a block profiled as the sync of `name` if profile_dir is set.
+
+        The name defaults to the stream name.
+        """
+        profiler = self.tap.profiler
+        if profiler is None:
+            return contextlib.nullcontext()
+        return profiler.profile(name or self.name)
+
+    def _sync_records(self, context: Optional[dict] = None) -> None:
+        """Sync the records, profiled if profile_dir is set."""
+        with self.profile():
+            super()._sync_records(context)
+
+    def _write_state_message(self) -> None:
+        """Write a STATE message, held until the open batch files are closed."""
+        batch_writer = self.tap.batch_writer
+        if batch_writer is not None and batch_writer.hold_state():
+            return
+        super()._write_state_message()
+        # Keys of the records emitted after this state are emitted again on resume
+        if self.tap.dedup_index is not None:
+            self.tap.dedup_index.commit()
+
+    def _write_request_duration_log(
+        self,
+        endpoint: str,
+        response: requests.Response,
+        context: Optional[dict],
+        extra_tags: Optional[dict],
+    ) -> None:
+        """Write the request duration, the time to first byte of streamed bodies."""
+        super()._write_request_duration_log(endpoint, response, context, extra_tags)
+        metrics = self.download_metrics(context)
+        metrics.requests += 1
+        metrics.time_to_first_byte += response.elapsed.total_seconds()
+
+    def _write_record_count_log(
+        self, record_count: int, context: Optional[dict]
+    ) -> None:
+        """Write the record count, then the other metrics of the job or stream."""
+        super()._write_record_count_log(record_count, context)
+        metrics = self.metrics(context)
+        metrics.emitted_rows += record_count
+        self.write_metrics(self.name, metrics, context)
+
+    def write_metrics(
+        self, name: str, metrics: StreamMetrics, context: Optional[dict]
+    ) -> None:
+        """Write the metrics recorded under `name`, then the metrics summary."""
+        extra_tags = {} if not context else {"context": context}
+        for metric_type, metric_name, value in metrics.metrics():
+            self._write_metric_log(
+                {
+                    "type": metric_type,
+                    "metric": metric_name,
+                    "value": value,
+                    "tags": {"stream": name},
+                },
+                extra_tags=extra_tags,
+            )
+        if "metrics_summary_path" in self.config:
+            self.tap.metrics.write_summary(Path(self.config["metrics_summary_path"]))
+
     @property
     def authenticator(self) -> BasicAuthenticator:
-        """Return a new authenticator object."""
-        return BasicAuthenticator.create_for_stream(
-            self,
-            username=self.config["username"],
-            password=self.config["password"],
-        )
+        """Return the authenticator shared by the streams of the tap."""
+        return self.tap.get_authenticator(self)
+
+    @property
+    def requests_session(self) -> requests.Session:
+        """Return the HTTP session shared by the streams of the tap."""
+        return self.tap.requests_session
 
     @property
     def http_headers(self) -> dict:
@@ -0,0 +1,78 @@
+"""Streaming CSV decoding for the reports."""
+import csv
+import io
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from tap_gladly.metrics import StreamMetrics
+
+Converter = Callable[[str], Any]
+
+
+def _to_boolean(value: str) -> Optional[bool]:
+    if value == "":
+        return None
+    return value.lower() == "true"
+
+
+def _nullable(convert: Converter) -> Converter:
+    def convert_nullable(value: str) -> Any:
+        if value == "":
+            return None
+        return convert(value)
+
+    return convert_nullable
+
+
+# Conversion of CSV strings by JSON schema type, strings are kept as they are
+CONVERTERS: Dict[str, Converter] = {
+    "integer": _nullable(int),
+    "number": _nullable(float),
+    "boolean": _to_boolean,
+}
+
+
+def column_converters(
+    header: Tuple[str, ...], schema: dict
+) -> List[Tuple[int, Converter]]:
+    """Return the index and converter of the columns which are not strings."""
+    converters = []
+    for index, column in enumerate(header):
+        types = schema.get("properties", {}).get(column, {}).get("type", "string")
+        if isinstance(types, str):
+            types = [types]
+        if "string" in types:
+            continue
+        for json_type in types:
+            if json_type in CONVERTERS:
+                converters.append((index, CONVERTERS[json_type]))
+                break
+    return converters
+
+
+def iter_csv_records(
+    body: IO[bytes], schema: dict, metrics: Optional[StreamMetrics] = None
+) -> Iterator[dict]:
+    """Decode a CSV body as it is read, return records typed from the schema.
+
+    Quoted fields may contain newlines. The header is read once, and only the
+    columns which are not strings in the schema are converted. Like
+    `csv.DictReader`, blank lines are skipped and missing fields are None. The
+    bytes read from the body and the time spent reading them are added to
+    `metrics`, if set.
+    """
+    if metrics is not None:
+        body = metrics.timed_reader(body)
+    text = io.TextIOWrapper(body, encoding="utf-8", newline="")
+    reader = csv.reader(text)
+    header = tuple(next(reader, ()))
+    converters = column_converters(header, schema)
+    width = len(header)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row += [None] * (width - len(row))  # type: ignore
+        for index, convert in converters:
+            if row[index] is not None:
+                row[index] = convert(row[index])
+        yield dict(zip(header, row))
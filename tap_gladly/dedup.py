@@ -0,0 +1,152 @@
+"""Index of the primary keys already emitted, across export jobs and runs."""
+import hashlib
+import logging
+import math
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Keys inserted in the store at once
+INSERT_BATCH_SIZE = 10_000
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+class BloomFilter:
+    """Set of keys which may answer that a key is present while it is not.
+
+    The filter of `capacity` keys has a `error_rate` chance of false positive,
+    it takes about 1.2 bytes per key for a 1% error rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        """Size the filter for `capacity` keys."""
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        """Add a key."""
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: object) -> bool:
+        """Return False if the key was never added, True if it may have been."""
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(str(key))
+        )
+
+
+class DedupIndex:
+    """Primary keys emitted by each stream, in a SQLite file.
+
+    A Bloom filter per stream, loaded from the store the first time the
+    stream is used, answers most lookups of new keys without querying the
+    store. New keys are only committed with `commit`, when the tap writes a
+    STATE message, so the keys of the records after the last state are
+    emitted again by a resumed sync. Keys emitted more than `max_age_days`
+    ago are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_age_days: Optional[int] = None,
+        min_capacity: int = 1_000_000,
+    ) -> None:
+        """Open the store at `path`, creating it if needed."""
+        self.path = Path(path)
+        self.max_age_days = max_age_days
+        self.min_capacity = min_capacity
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS emitted_keys ("
+            " stream TEXT NOT NULL, key TEXT NOT NULL, emitted_day INTEGER NOT NULL,"
+            " PRIMARY KEY (stream, key)"
+            ") WITHOUT ROWID"
+        )
+        self.filters: Dict[str, BloomFilter] = {}
+        self.pending: Dict[str, Set[str]] = {}
+        self.inserts: List[Tuple[str, str, int]] = []
+        self.today = int(time.time() // SECONDS_PER_DAY)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the keys emitted more than max_age_days ago."""
+        if self.max_age_days is None:
+            return
+        with self.connection:
+            deleted = self.connection.execute(
+                "DELETE FROM emitted_keys WHERE emitted_day < ?",
+                (self.today - self.max_age_days - 1,),
+            ).rowcount
+        if deleted:
+            logging.info(f"Evicted {deleted} keys from the dedup index {self.path}")
+
+    def load_filter(self, stream: str) -> BloomFilter:
+        """Return the Bloom filter of the keys of `stream`, built from the store."""
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM emitted_keys WHERE stream = ?", (stream,)
+        ).fetchone()
+        pending = self.pending.get(stream, set())
+        bloom_filter = BloomFilter(max(self.min_capacity, 2 * (count + len(pending))))
+        for (key,) in self.connection.execute(
+            "SELECT key FROM emitted_keys WHERE stream = ?", (stream,)
+        ):
+            bloom_filter.add(key)
+        for key in pending:
+            bloom_filter.add(key)
+        self.filters[stream] = bloom_filter
+        return bloom_filter
+
+    def add(self, stream: str, key: str) -> bool:
+        """Add the key emitted by `stream`, return False if it already was."""
+        bloom_filter = self.filters.get(stream) or self.load_filter(stream)
+        pending = self.pending.setdefault(stream, set())
+        if key in bloom_filter and (key in pending or self._is_stored(stream, key)):
+            return False
+        if bloom_filter.count >= bloom_filter.capacity:
+            bloom_filter = self.load_filter(stream)
+        bloom_filter.add(key)
+        pending.add(key)
+        self.inserts.append((stream, key, self.today))
+        if len(self.inserts) >= INSERT_BATCH_SIZE:
+            self._insert()
+        return True
+
+    def _is_stored(self, stream: str, key: str) -> bool:
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM emitted_keys WHERE stream = ? AND key = ?",
+                (stream, key),
+            ).fetchone()
+            is not None
+        )
+
+    def _insert(self) -> None:
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO emitted_keys VALUES (?, ?, ?)", self.inserts
+        )
+        self.inserts = []
+
+    def commit(self) -> None:
+        """Save the keys added since the last commit."""
+        self._insert()
+        self.connection.commit()
+        self.pending = {}
+
+    def close(self) -> None:
+        """Close the store, without saving the keys added since the last commit."""
+        self.connection.close()
@@ -0,0 +1,63 @@
+"""JSON Lines decoding for the export files."""
+import re
+from typing import Iterable, Iterator, Optional
+
+from singer_sdk.helpers.jsonpath import extract_jsonpath
+
+# orjson is several times faster than the standard library, use it if installed
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads  # type: ignore
+
+# Path selecting every record of a list, or the record itself for an object
+ALL_RECORDS_JSONPATH = "$[*]"
+
+# "type" of a "content" object, found before any object nested in the content.
+# The "content" key may itself be nested in another object of the line.
+CONTENT_TYPE_PATTERN = re.compile(rb'"content"\s*:\s*\{[^{}]*?"type"\s*:\s*"([^"\\]*)"')
+
+
+def decode_records(
+    line: bytes, records_jsonpath: str = ALL_RECORDS_JSONPATH
+) -> Iterable[dict]:
+    """Decode a JSON line and return the records found at `records_jsonpath`.
+
+    The default path is applied without evaluating the JSONPath expression,
+    which is by far the most expensive step when every line is a record.
+    """
+    if not line:
+        return ()
+    record = loads(line)
+    if records_jsonpath != ALL_RECORDS_JSONPATH:
+        return extract_jsonpath(records_jsonpath, input=record)
+    if isinstance(record, list):
+        return record
+    return (record,)
+
+
+def iter_jsonl_records(
+    lines: Iterable[bytes], records_jsonpath: str = ALL_RECORDS_JSONPATH
+) -> Iterator[dict]:
+    """Decode JSON Lines and return the records found at `records_jsonpath`."""
+    for line in lines:
+        yield from decode_records(line, records_jsonpath)
+
+
+def peek_content_type(line: bytes) -> Optional[bytes]:
+    """Return the content type of a conversation item without decoding it.
+
+    Only the "content" of the conversation item object itself is matched: if the
+    first "content" object of the line is nested in another object, it is left to
+    the decoding. The braces before it are counted on the raw line, braces in the
+    string values before the content would mislead the count, the ids,
+    timestamps and initiator of an item have none. Return None if it cannot be
+    found by a scan of the raw line, the line must then be decoded to know it.
+    """
+    match = CONTENT_TYPE_PATTERN.search(line)
+    if match is None:
+        return None
+    prefix = line[: match.start()]
+    if prefix.count(b"{") != prefix.count(b"}") + 1:
+        return None
+    return match.group(1)
@@ -0,0 +1,164 @@
+"""Performance metrics of the streams, per stream and export job."""
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, cast
+
+
+@dataclass
+class StreamMetrics:
+    """Counters and timers of a stream, for one export job or the whole run.
+
+    The download and parse timers only include the time spent downloading and
+    decoding, not the time the records spend being written by the tap.
+    """
+
+    requests: int = 0
+    time_to_first_byte: float = 0.0
+    download_bytes: int = 0
+    download_seconds: float = 0.0
+    parsed_lines: int = 0
+    prefiltered_lines: int = 0
+    parse_seconds: float = 0.0
+    filtered_rows: int = 0
+    duplicate_rows: int = 0
+    offloaded_payloads: int = 0
+    emitted_rows: int = 0
+
+    # Metric name and Singer metric type of each field
+    METRIC_TYPES = {
+        "requests": "counter",
+        "time_to_first_byte": "timer",
+        "download_bytes": "counter",
+        "download_seconds": "timer",
+        "parsed_lines": "counter",
+        "prefiltered_lines": "counter",
+        "parse_seconds": "timer",
+        "filtered_rows": "counter",
+        "duplicate_rows": "counter",
+        "offloaded_payloads": "counter",
+        "emitted_rows": "counter",
+    }
+
+    def add(self, other: "StreamMetrics") -> None:
+        """Add the counters and timers of `other`."""
+        for field in fields(self):
+            setattr(
+                self, field.name, getattr(self, field.name) + getattr(other, field.name)
+            )
+
+    def summary(self) -> dict:
+        """Return the metrics with the throughput derived from them."""
+        summary = asdict(self)
+        summary["download_bytes_per_second"] = _rate(
+            self.download_bytes, self.download_seconds
+        )
+        summary["parsed_lines_per_second"] = _rate(
+            self.parsed_lines, self.parse_seconds
+        )
+        return summary
+
+    def metrics(self) -> List[Tuple[str, str, float]]:
+        """Return the type, name and value of the metrics which were measured."""
+        return [
+            (metric_type, f"gladly_{name}", getattr(self, name))
+            for name, metric_type in self.METRIC_TYPES.items()
+            if getattr(self, name)
+        ]
+
+    def iter_timed_chunks(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Return the downloaded chunks, counting their size and download time."""
+        iterator = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(iterator, None)
+            self.download_seconds += time.perf_counter() - start
+            if chunk is None:
+                return
+            self.download_bytes += len(chunk)
+            yield chunk
+
+    def timed_reader(self, body: IO[bytes]) -> IO[bytes]:
+        """Return a reader of `body`, counting the size and time of what is read."""
+        return cast(IO[bytes], io.BufferedReader(_TimedReader(body, self)))
+
+
+class _TimedReader(io.RawIOBase):
+    def __init__(self, body: IO[bytes], metrics: StreamMetrics) -> None:
+        self.body = body
+        self.metrics = metrics
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        start = time.perf_counter()
+        size = self.body.readinto(buffer)  # type: ignore
+        self.metrics.download_seconds += time.perf_counter() - start
+        self.metrics.download_bytes += size or 0
+        return size
+
+
+def _rate(count: float, seconds: float) -> Optional[float]:
+    if not seconds:
+        return None
+    return round(count / seconds, 1)
+
+
+class MetricsRecorder:
+    """Metrics of all the streams of a run, per stream and export job.
+
+    Metrics of a job are recorded by the thread downloading its files, and
+    read by the main thread once the job is synced.
+    """
+
+    def __init__(self) -> None:
+        """Start without any metrics."""
+        self._lock = threading.Lock()
+        self._metrics: Dict[Tuple[str, Optional[str]], StreamMetrics] = {}
+
+    def get(self, stream_name: str, job_id: Optional[str]) -> StreamMetrics:
+        """Return the metrics of a stream for a job, or for the stream if None."""
+        key = (stream_name, job_id)
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            with self._lock:
+                metrics = self._metrics.setdefault(key, StreamMetrics())
+        return metrics
+
+    def summary(self) -> dict:
+        """Return the metrics of every stream, total and per job."""
+        streams: Dict[str, dict] = {}
+        totals: Dict[str, StreamMetrics] = {}
+        with self._lock:
+            items = sorted(
+                self._metrics.items(), key=lambda item: (item[0][0], item[0][1] or "")
+            )
+        for (stream_name, job_id), metrics in items:
+            stream = streams.setdefault(stream_name, {"jobs": {}})
+            totals.setdefault(stream_name, StreamMetrics()).add(metrics)
+            if job_id is not None:
+                stream["jobs"][job_id] = metrics.summary()
+        for stream_name, total in totals.items():
+            streams[stream_name]["total"] = total.summary()
+        return {"streams": streams}
+
+    def write_summary(self, path: Path) -> None:
+        """Write the summary as JSON, replacing the previous one atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=path.parent, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "w") as summary_file:
+                json.dump(self.summary(), summary_file, indent=2)
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
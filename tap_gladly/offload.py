@@ -0,0 +1,66 @@
+"""Offload of oversized record payloads to compressed side files."""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+TEMPORARY_SUFFIX = ".tmp"
+
+# Schema of the reference to an offloaded payload
+PAYLOAD_REF_SCHEMA = {
+    "type": ["object", "null"],
+    "properties": {
+        "uri": {"type": "string"},
+        "sha256": {"type": "string"},
+        "size": {"type": "integer"},
+    },
+}
+
+
+class PayloadOffloader:
+    """Content addressed directory of the payloads larger than `threshold_bytes`.
+
+    Payloads are written as gzip compressed JSON, named by the SHA-256 of their
+    JSON, so a payload emitted several times is only written once.
+    """
+
+    def __init__(self, directory: Path, threshold_bytes: int) -> None:
+        """Create the directory if needed."""
+        self.directory = Path(directory)
+        self.threshold_bytes = threshold_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def offload(self, payload: Any) -> Optional[dict]:
+        """Write the payload if it is too large, return its reference.
+
+        The size is the one of the compact UTF-8 JSON of the payload. Return None
+        if the payload is kept in the record.
+        """
+        data = json.dumps(
+            payload, separators=(",", ":"), ensure_ascii=False, default=str
+        ).encode()
+        if len(data) < self.threshold_bytes:
+            return None
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.directory / sha256[:2] / f"{sha256}.json.gz"
+        if not path.is_file():
+            self._write(path, data)
+        return {"uri": path.resolve().as_uri(), "sha256": sha256, "size": len(data)}
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=path.parent, suffix=TEMPORARY_SUFFIX
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as side_file:
+                with gzip.GzipFile(fileobj=side_file, mode="wb", mtime=0) as gzipped:
+                    gzipped.write(data)
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
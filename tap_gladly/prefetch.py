@@ -0,0 +1,153 @@
+"""Bounded thread pool fetching export files ahead of the sync."""
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+_DONE = object()
+
+
+class _Failure:
+    """Exception raised by a producer, re-raised on the consumer side."""
+
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+class _Cancelled(Exception):
+    """Raised in a producer when the prefetcher or its key is cancelled."""
+
+
+class Prefetcher:
+    """Run record generators in a thread pool and replay them in order.
+
+    Each submitted generator is consumed by a worker thread into its own
+    bounded queue, so at most `max_workers` files are downloaded at once and a
+    producer blocks once `queue_size` chunks are waiting to be emitted. The
+    records of a key are replayed in the order they were produced. Keys which
+    will not be popped must be cancelled, or their producer keeps blocking a
+    worker thread.
+    """
+
+    def __init__(
+        self, max_workers: int, queue_size: int = 20, chunk_size: int = 500
+    ) -> None:
+        """Start the thread pool."""
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tap-gladly-prefetch"
+        )
+        self._closed = threading.Event()
+        self._queues: Dict[Hashable, queue.Queue] = {}
+        self._fetches: Dict[Hashable, Tuple[Future, threading.Event]] = {}
+        self._futures: List[Future] = []
+
+    def __enter__(self) -> "Prefetcher":
+        """Return the prefetcher."""
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Close the prefetcher."""
+        self.close()
+
+    def __len__(self) -> int:
+        """Return the number of keys submitted and not popped yet."""
+        return len(self._queues)
+
+    def submit(self, key: Hashable, records: Callable[[], Iterable[Any]]) -> None:
+        """Schedule `records` to be fetched in the background under `key`."""
+        if key in self._queues:
+            return
+        records_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        cancelled = threading.Event()
+        future = self._executor.submit(self._produce, records, records_queue, cancelled)
+        self._queues[key] = records_queue
+        self._fetches[key] = (future, cancelled)
+        self._futures.append(future)
+
+    def pop(self, key: Hashable) -> Optional[Iterator[Any]]:
+        """Return the records fetched under `key`, or None if never submitted."""
+        records_queue = self._queues.pop(key, None)
+        if records_queue is None:
+            return None
+        del self._fetches[key]
+        return self._consume(records_queue)
+
+    def cancel(self, key: Hashable) -> None:
+        """Stop fetching the records of `key`, if submitted and not popped."""
+        records_queue = self._queues.pop(key, None)
+        if records_queue is None:
+            return
+        future, cancelled = self._fetches.pop(key)
+        cancelled.set()
+        future.cancel()
+        # Release the fetched chunks now, rather than once the producer stops
+        while True:
+            try:
+                records_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def close(self) -> None:
+        """Cancel pending fetches and stop the running ones."""
+        self._closed.set()
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+        self._queues.clear()
+        self._fetches.clear()
+
+    def _produce(
+        self,
+        records: Callable[[], Iterable[Any]],
+        records_queue: queue.Queue,
+        cancelled: threading.Event,
+    ) -> None:
+        try:
+            chunk = []
+            for record in records():
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    self._put(records_queue, chunk, cancelled)
+                    chunk = []
+            self._put(records_queue, chunk, cancelled)
+            self._put(records_queue, _DONE, cancelled)
+        except _Cancelled:
+            pass
+        except BaseException as ex:
+            try:
+                self._put(records_queue, _Failure(ex), cancelled)
+            except _Cancelled:
+                pass
+
+    def _put(
+        self, records_queue: queue.Queue, item: Any, cancelled: threading.Event
+    ) -> None:
+        while not self._closed.is_set() and not cancelled.is_set():
+            try:
+                records_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _Cancelled()
+
+    @staticmethod
+    def _consume(records_queue: queue.Queue) -> Iterator[Any]:
+        while True:
+            item = records_queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield from item
@@ -0,0 +1,186 @@
+"""Profiling of the stream syncs, for CPU and allocation hot spots."""
+import cProfile
+import json
+import os
+import signal
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, Iterator, List, Optional
+
+# Stages of the sync, with the function names and file path parts of their frames
+STAGES = (
+    ("http_read", (), ("urllib3", "requests", "http/client.py", "socket.py", "ssl.py")),
+    ("extract_jsonpath", ("extract_jsonpath",), ("jsonpath",)),
+    ("json_loads", ("decode_records",), ("json/decoder.py",)),
+    ("post_process", ("post_process",), ()),
+    ("record_write", ("_write_record_message", "write_message"), ()),
+)
+
+
+def frame_stack(frame: Optional[FrameType]) -> List[FrameType]:
+    """Return the frames of a stack, from the outermost to `frame`."""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def frame_name(frame: FrameType) -> str:
+    """Return the name of a frame function in collapsed stacks."""
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def stage_of(frames: List[FrameType]) -> str:
+    """Return the stage of the innermost frame belonging to one, or "other"."""
+    for frame in reversed(frames):
+        code = frame.f_code
+        for stage, function_names, path_parts in STAGES:
+            if code.co_name in function_names or any(
+                part in code.co_filename for part in path_parts
+            ):
+                return stage
+    return "other"
+
+
+@dataclass
+class StageProfile:
+    """Samples and allocated bytes of a stage."""
+
+    samples: int = 0
+    allocated_bytes: int = 0
+
+
+class Profiler:
+    """Profile of the streams synced in `profile` blocks, written to `directory`.
+
+    Each stream is profiled by cProfile, exclusive of the child streams it
+    syncs. The stack of the sync is also sampled every `interval` seconds of
+    CPU time by a SIGPROF timer, with the memory allocated since the previous
+    sample as traced by tracemalloc, attributed to the synced stream and the
+    stage of the sample. The results are written when the outermost block
+    ends:
+
+    - `<stream>.pstats`: cProfile statistics of each stream,
+    - `cpu.collapsed` and `alloc.collapsed`: collapsed stacks weighted by
+      samples and allocated bytes, for flame graphs,
+    - `stages.json`: time and allocated bytes of each stage of each stream.
+
+    Stacks are only sampled on platforms with interval timers, when the
+    streams are synced by the main thread.
+    """
+
+    def __init__(self, directory: Path, interval: float = 0.005) -> None:
+        """Create the directory if needed."""
+        self.directory = Path(directory)
+        self.interval = interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.streams: List[str] = []
+        self.cpu_stacks: Counter = Counter()
+        self.alloc_stacks: Counter = Counter()
+        self.stages: Dict[str, Dict[str, StageProfile]] = {}
+        self._last_memory = 0
+        self._started_tracemalloc = False
+        self._previous_handler: Any = None
+        self._sampling = False
+
+    @contextmanager
+    def profile(self, stream: str) -> Iterator[None]:
+        """Profile the sync of `stream` in the block."""
+        if not self.streams:
+            self.start()
+        else:
+            self.profiles[self.streams[-1]].disable()
+        self.streams.append(stream)
+        profile = self.profiles.setdefault(stream, cProfile.Profile())
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.streams.pop()
+            if self.streams:
+                self.profiles[self.streams[-1]].enable()
+            else:
+                self.stop()
+
+    def start(self) -> None:
+        """Start tracing allocations and sampling the stacks."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._last_memory = tracemalloc.get_traced_memory()[0]
+        if hasattr(signal, "setitimer"):
+            try:
+                self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+            except ValueError:
+                # Signal handlers can only be set by the main thread
+                return
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        """Stop sampling, then write the results."""
+        if self._previous_handler is not None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler)
+            self._previous_handler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.write()
+
+    def _sample(self, signal_number: int, frame: Optional[FrameType]) -> None:
+        # The timer may fire again while a slow sample is recorded
+        if self._sampling or not self.streams:
+            return
+        self._sampling = True
+        try:
+            self._record(self.streams[-1], frame_stack(frame))
+        finally:
+            self._sampling = False
+
+    def _record(self, root: str, frames: List[FrameType]) -> None:
+        memory = tracemalloc.get_traced_memory()[0]
+        allocated, self._last_memory = max(memory - self._last_memory, 0), memory
+        stack = ";".join([root] + [frame_name(frame) for frame in frames])
+        self.cpu_stacks[stack] += 1
+        stage = self.stages.setdefault(root, {}).setdefault(
+            stage_of(frames), StageProfile()
+        )
+        stage.samples += 1
+        if allocated:
+            self.alloc_stacks[stack] += allocated
+            stage.allocated_bytes += allocated
+
+    def write(self) -> None:
+        """Write the statistics, collapsed stacks and stages of the streams."""
+        for stream, profile in self.profiles.items():
+            profile.dump_stats(str(self.directory / f"{stream}.pstats"))
+        for name, stacks in (
+            ("cpu", self.cpu_stacks),
+            ("alloc", self.alloc_stacks),
+        ):
+            with open(self.directory / f"{name}.collapsed", "w") as collapsed:
+                for stack, weight in stacks.most_common():
+                    collapsed.write(f"{stack} {weight}\n")
+        stages = {
+            root: {
+                name: {
+                    "seconds": round(stage.samples * self.interval, 3),
+                    "allocated_bytes": stage.allocated_bytes,
+                }
+                for name, stage in root_stages.items()
+            }
+            for root, root_stages in self.stages.items()
+        }
+        with open(self.directory / "stages.json", "w") as stages_file:
+            json.dump(stages, stages_file, indent=2, sort_keys=True)
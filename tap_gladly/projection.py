@@ -0,0 +1,111 @@
+"""Record projection compiled from the stream schema and selection mask."""
+import logging
+from typing import Any, Callable, Dict, FrozenSet, Mapping, Optional, Set, Tuple
+
+Breadcrumb = Tuple[str, ...]
+Converter = Callable[[Any], Any]
+# Selection of each schema breadcrumb, the mask of the SDK streams
+SelectionMask = Mapping[Breadcrumb, bool]
+
+
+def compile_projection(
+    schema: dict,
+    mask: Optional[SelectionMask] = None,
+    logger: Optional[logging.Logger] = None,
+) -> Callable[[dict], dict]:
+    """Return a function projecting decoded records on the schema.
+
+    The result matches the SDK `pop_deselected_record_properties` followed by
+    `conform_record_data_types`, for records decoded from JSON or CSV: unknown
+    and deselected top level properties are dropped, deselected nested
+    properties are dropped and top level booleans are coerced. The schema is
+    walked once here instead of on every record, nested objects without any
+    deselected property are passed through without being copied, and the
+    input record is never mutated.
+    """
+    properties = schema.get("properties", {})
+    known = frozenset(properties)
+    selected = frozenset(
+        name for name in properties if mask is None or mask[("properties", name)]
+    )
+    converters: Dict[str, Converter] = {}
+    for name in selected:
+        if _is_boolean_type(properties[name]):
+            converters[name] = _to_boolean
+            continue
+        nested = _compile_nested(properties[name], mask, ("properties", name))
+        if nested is not None:
+            converters[name] = nested
+    conversions = tuple(converters.items())
+    warned: Set[str] = set()
+
+    def project(row: dict) -> dict:
+        if logger is not None and not row.keys() <= known:
+            _warn_unmapped(logger, row.keys() - known - warned, warned)
+        record = {key: value for key, value in row.items() if key in selected}
+        for name, convert in conversions:
+            if name in record:
+                record[name] = convert(record[name])
+        return record
+
+    return project
+
+
+def _compile_nested(
+    schema: dict, mask: Optional[SelectionMask], breadcrumb: Breadcrumb
+) -> Optional[Converter]:
+    """Return a function dropping the deselected properties of an object.
+
+    Return None if no property of the object is deselected.
+    """
+    properties = schema.get("properties")
+    if not properties or mask is None:
+        return None
+    deselected: FrozenSet[str] = frozenset(
+        name for name in properties if not mask[breadcrumb + ("properties", name)]
+    )
+    converters = []
+    for name in properties.keys() - deselected:
+        nested = _compile_nested(
+            properties[name], mask, breadcrumb + ("properties", name)
+        )
+        if nested is not None:
+            converters.append((name, nested))
+    if not deselected and not converters:
+        return None
+    conversions = tuple(converters)
+
+    def project(value: Any) -> Any:
+        if not isinstance(value, dict):
+            return value
+        record = {key: item for key, item in value.items() if key not in deselected}
+        for name, convert in conversions:
+            if name in record:
+                record[name] = convert(record[name])
+        return record
+
+    return project
+
+
+def _is_boolean_type(property_schema: dict) -> bool:
+    """Return True if the property type is boolean, like the SDK conformance."""
+    types = property_schema.get("anyOf", [property_schema.get("type")])
+    return any(
+        property_type == "boolean" or "boolean" in (property_type or ())
+        for property_type in types
+    )
+
+
+def _to_boolean(value: Any) -> Optional[bool]:
+    if value is None:
+        return None
+    return value != 0
+
+
+def _warn_unmapped(logger: logging.Logger, names: Set[str], warned: Set[str]) -> None:
+    if names:
+        logger.info(
+            f"Properties {tuple(sorted(names))} were present in the records but "
+            "not found in catalog schema. Ignoring."
+        )
+        warned.update(names)
@@ -0,0 +1,171 @@
+"""Request scheduler shared by the streams, adapting to the API rate limits."""
+import email.utils
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import requests
+
+# Priorities of the requests, the job list is requested before the job files
+HIGH_PRIORITY = 0
+LOW_PRIORITY = 1
+
+# Pause after a 429 response without Retry-After header
+DEFAULT_RETRY_AFTER = 1.0
+
+# Longest wait before checking again if a request can be sent
+MAX_WAIT = 0.5
+
+
+class RequestScheduler:
+    """Token bucket and AIMD concurrency limit shared by all the requests.
+
+    Requests are sent at most `rate` per second, in bursts of `burst`, and at
+    most `concurrency` at once. The concurrency limit starts at
+    `max_concurrency`, is halved when the API throttles a request and
+    increases by one after about `concurrency` successful requests. Throttled
+    responses and rate limit headers pause all the requests until the API
+    accepts requests again. High priority requests are sent before the low
+    priority requests waiting.
+
+    A request holds its concurrency slot until its response headers are
+    received, the body of streamed responses is read without it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+    ) -> None:
+        """Start with the maximum concurrency and a full bucket."""
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 1.0)
+        self.tokens = self.burst
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._refilled_at = time.monotonic()
+        self._high_priority_waiting = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def request(self, priority: int = LOW_PRIORITY) -> Iterator[None]:
+        """Wait until a request can be sent, hold its slot while it is sent."""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority: int = LOW_PRIORITY) -> None:
+        """Wait until a request of `priority` can be sent and take its slot."""
+        with self._condition:
+            if priority == HIGH_PRIORITY:
+                self._high_priority_waiting += 1
+            try:
+                while True:
+                    wait = self._wait_time(priority)
+                    if not wait:
+                        break
+                    self._condition.wait(min(wait, MAX_WAIT))
+            finally:
+                if priority == HIGH_PRIORITY:
+                    self._high_priority_waiting -= 1
+            self.tokens -= 1
+            self.in_flight += 1
+
+    def release(self) -> None:
+        """Free the slot of a request whose response was received."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record_response(self, response: requests.Response) -> None:
+        """Adapt the concurrency and pause the requests as the API asks to."""
+        with self._condition:
+            now = time.monotonic()
+            if response.status_code == 429:
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.tokens = min(self.tokens, 0)
+                retry_after = parse_retry_after(response) or DEFAULT_RETRY_AFTER
+                self.pause(now + retry_after)
+                logging.warning(
+                    f"Throttled by the API, pausing requests for {retry_after}s, "
+                    f"concurrency reduced to {int(self.concurrency)}"
+                )
+            elif response.status_code < 400:
+                self.concurrency = min(
+                    float(self.max_concurrency), self.concurrency + 1 / self.concurrency
+                )
+            remaining = _header_number(
+                response, "X-RateLimit-Remaining", "RateLimit-Remaining"
+            )
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+                if remaining < 1:
+                    reset = _header_number(
+                        response, "X-RateLimit-Reset", "RateLimit-Reset"
+                    )
+                    if reset is not None:
+                        # Either seconds until the reset, or its epoch time
+                        if reset > time.time() / 2:
+                            reset -= time.time()
+                        self.pause(now + max(reset, 0))
+            self._condition.notify_all()
+
+    def pause(self, until: float) -> None:
+        """Hold all the requests until the monotonic time `until`."""
+        self.paused_until = max(self.paused_until, until)
+
+    def _wait_time(self, priority: int) -> float:
+        """Return how long to wait before sending a request, 0 if it can be."""
+        now = time.monotonic()
+        if self.rate is not None:
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._refilled_at) * self.rate
+            )
+        self._refilled_at = now
+        if now < self.paused_until:
+            return self.paused_until - now
+        if priority != HIGH_PRIORITY and self._high_priority_waiting:
+            return MAX_WAIT
+        if self.in_flight >= int(self.concurrency):
+            return MAX_WAIT
+        if self.tokens < 1:
+            if self.rate is None:
+                # No rate, the bucket is only emptied by rate limit headers
+                self.tokens = 1
+                return 0
+            return (1 - self.tokens) / self.rate
+        return 0
+
+
+def parse_retry_after(response: requests.Response) -> Optional[float]:
+    """Return the seconds to wait from the Retry-After header, if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0)
+
+
+def _header_number(response: requests.Response, *names: str) -> Optional[float]:
+    for name in names:
+        value = response.headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
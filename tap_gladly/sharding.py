@@ -0,0 +1,169 @@
+"""Split a sync across tap processes by export job, and merge their states."""
+import argparse
+import copy
+import hashlib
+import json
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from singer_sdk import exceptions
+
+from tap_gladly.timewindow import to_epoch
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Shard `index` of `count` shards, syncing the keys hashed to it.
+
+    Keys are hashed with blake2b, so every process assigns a key to the same
+    shard whatever its Python hash seed.
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> Optional["Shard"]:
+        """Return the shard of the shard_index and shard_count settings, if set."""
+        if "shard_index" not in config and "shard_count" not in config:
+            return None
+        if "shard_index" not in config or "shard_count" not in config:
+            raise exceptions.ConfigValidationError(
+                "shard_index and shard_count must be set together"
+            )
+        shard = cls(config["shard_index"], config["shard_count"])
+        if not 0 <= shard.index < shard.count:
+            raise exceptions.ConfigValidationError(
+                f"shard_index must be between 0 and shard_count - 1, got {shard.index}"
+            )
+        return shard
+
+    def __contains__(self, key: object) -> bool:
+        """Return True if the key is synced by the shard."""
+        digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.count == self.index
+
+
+def merge_states(states: Iterable[dict]) -> dict:
+    """Return the state of a sync whose shards ended with `states`.
+
+    The merged bookmark is the earliest bookmark of the shards, so that no
+    shard misses jobs on the next run, the synced jobs are remembered by the
+    known jobs index. The day the report windows are synced until is merged
+    the same way. If a shard has no bookmark, e.g. it stopped before the
+    end of its first sync, the merged state has none either and the next run
+    starts from start_date. Partitions of the same context keep their most
+    advanced state, the state of each account is merged as the state of a
+    stream.
+    """
+    states = list(states)
+    bookmarks: Dict[str, dict] = {}
+    for state in states:
+        for stream_name, stream_state in state.get("bookmarks", {}).items():
+            stream_state = copy.deepcopy(stream_state)
+            merged = bookmarks.get(stream_name)
+            if merged is None:
+                bookmarks[stream_name] = stream_state
+            else:
+                _merge_stream_state(merged, stream_state)
+    for stream_name, merged in bookmarks.items():
+        if any(stream_name not in state.get("bookmarks", {}) for state in states):
+            _unset_bookmarks(merged)
+    return {"bookmarks": bookmarks}
+
+
+def _merge_stream_state(merged: dict, stream_state: dict) -> None:
+    value = stream_state.get("replication_key_value")
+    if value is None or merged.get("replication_key_value") is None:
+        # Jobs older than the bookmarks of the other shards may not be synced
+        merged.pop("replication_key_value", None)
+    elif to_epoch(value) < to_epoch(merged["replication_key_value"]):
+        merged["replication_key"] = stream_state["replication_key"]
+        merged["replication_key_value"] = value
+    synced_until = stream_state.get("syncedUntil")
+    if synced_until is None or merged.get("syncedUntil") is None:
+        # Report windows of the other shards before it may not be synced
+        merged.pop("syncedUntil", None)
+    else:
+        merged["syncedUntil"] = min(merged["syncedUntil"], synced_until)
+    if "known_jobs" in stream_state:
+        _merge_known_jobs(merged, stream_state["known_jobs"])
+    if "partitions" in merged or "partitions" in stream_state:
+        merged["partitions"] = _merge_partitions(
+            merged.get("partitions", []), stream_state.get("partitions", [])
+        )
+    for key, key_value in stream_state.items():
+        if key not in ("replication_key_value", "syncedUntil"):
+            merged.setdefault(key, key_value)
+
+
+def _unset_bookmarks(stream_state: dict) -> None:
+    """Unset the bookmarks of a stream and its accounts, not set by every shard."""
+    stream_state.pop("replication_key_value", None)
+    stream_state.pop("syncedUntil", None)
+    for partition in stream_state.get("partitions", []):
+        if _is_account_partition(partition):
+            _unset_bookmarks(partition)
+
+
+def _merge_known_jobs(merged: dict, known_jobs: dict) -> None:
+    index = merged.setdefault("known_jobs", known_jobs)
+    if index is known_jobs:
+        return
+    # A job is only known if synced by all the streams of the index
+    index["streams"] = sorted(set(index["streams"]) & set(known_jobs["streams"]))
+    index["jobs"].update(known_jobs["jobs"])
+
+
+def _merge_partitions(partitions: List[dict], other: List[dict]) -> List[dict]:
+    merged: Dict[str, dict] = {}
+    for partition in partitions + other:
+        key = _context_key(partition)
+        if key not in merged:
+            merged[key] = partition
+        elif _is_account_partition(partition):
+            # State of an account, merged as the state of a stream
+            _merge_stream_state(merged[key], partition)
+        elif _progress(partition) > _progress(merged[key]):
+            merged[key] = partition
+    keys = {_context_key(partition) for partition in partitions}
+    other_keys = {_context_key(partition) for partition in other}
+    for key in keys ^ other_keys:
+        if _is_account_partition(merged[key]):
+            _unset_bookmarks(merged[key])
+    return list(merged.values())
+
+
+def _context_key(partition: dict) -> str:
+    return json.dumps(partition["context"], sort_keys=True)
+
+
+def _is_account_partition(partition: dict) -> bool:
+    return partition["context"].keys() == {"account"}
+
+
+def _progress(partition: dict) -> Tuple[float, str]:
+    if partition.get("synced"):
+        return float("inf"), ""
+    return (
+        partition.get("checkpoint", {}).get("line", 0),
+        partition.get("syncedUntil", ""),
+    )
+
+
+def main() -> None:
+    """Write the merged state of the shard state files to stdout."""
+    parser = argparse.ArgumentParser(description="Merge the states of tap shards.")
+    parser.add_argument("state_files", nargs="+", help="State file of each shard")
+    args = parser.parse_args()
+    states = []
+    for state_file in args.state_files:
+        with open(state_file) as state:
+            states.append(json.load(state))
+    json.dump(merge_states(states), sys.stdout)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,41 @@
 """Stream type classes for tap-gladly."""
 import abc
-import csv
+import functools
 import json
 import logging
-from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
+import time
+from datetime import date, timedelta
+from typing import (
+    IO,
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    cast,
+)
 
-import pendulum
 import requests
-from singer_sdk import exceptions
-from singer_sdk.helpers.jsonpath import extract_jsonpath
+from singer_sdk.pagination import BaseAPIPaginator, HeaderLinkPaginator
 
-from tap_gladly.client import gladlyStream
+from tap_gladly.accounts import account_context
+from tap_gladly.client import SCHEMAS_DIR, gladlyStream
+from tap_gladly.csv_reports import iter_csv_records
+from tap_gladly.jsonl import decode_records, peek_content_type
+from tap_gladly.metrics import StreamMetrics
+from tap_gladly.offload import PAYLOAD_REF_SCHEMA
+from tap_gladly.prefetch import Prefetcher
+from tap_gladly.scheduler import HIGH_PRIORITY
+from tap_gladly.timewindow import DAY, TimeWindow, epoch_date, now_epoch, to_epoch
 
-SCHEMAS_DIR = Path(__file__).parent / Path("./schemas")
+CONVERSATION_SCHEMA_PREFIX = "export_conversation-"
 
 
 class ExportCompletedJobsStream(gladlyStream):
@@ -22,52 +44,673 @@ class ExportCompletedJobsStream(gladlyStream):
     name = "jobs"
     path = "/export/jobs?status=COMPLETED"
     primary_keys = ["id"]
-    replication_key = None
-    # Optionally, you may also use `schema_filepath` in place of `schema`:
-    schema_filepath = SCHEMAS_DIR / "export_jobs.json"
+    replication_key = "updatedAt"
+    schema_file = "export_jobs.json"
+    # The job list is requested before the job files being downloaded
+    request_priority = HIGH_PRIORITY
+
+    # Longest wait between polls of the job list in follow mode, in intervals
+    FOLLOW_BACKOFF_FACTOR = 16
+
+    # Known jobs index and job window of each account, None without accounts
+    _known_jobs: Optional[Dict[Optional[str], Dict[str, str]]] = None
+    _job_windows: Optional[Dict[Optional[str], TimeWindow]] = None
+    # Context of the job list being requested, its last page, and the listing
+    # order seen so far
+    _listing_context: Optional[dict] = None
+    _page_jobs: List[dict] = []
+    _last_listed_at: Optional[int] = None
+    _listed_latest_first = True
+
+    # Downloads the files of the listed jobs in background, with the jobs listed
+    # for each account and not synced yet
+    prefetcher: Optional[Prefetcher] = None
+    _prefetched_jobs: Optional[Dict[Optional[str], List[dict]]] = None
+
+    def get_url_params(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Dict[str, Any]:
+        """Return no sorting parameters, the jobs are filtered in post_process."""
+        return {}
+
+    def get_new_paginator(self) -> BaseAPIPaginator:
+        """Return a paginator following the Link header of the job list."""
+        self._last_listed_at = None
+        self._listed_latest_first = True
+        return ExportJobsPaginator(self, self._listing_context)
+
+    def request_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Return the listed jobs of the account in context."""
+        self._listing_context = context
+        return super().request_records(context)
+
+    def prepare_request(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> requests.PreparedRequest:
+        """Return the request of the first page, or of the next page link."""
+        prepared_request = super().prepare_request(context, next_page_token)
+        if next_page_token:
+            prepared_request.prepare_url(next_page_token.geturl(), None)
+        return prepared_request
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Return the listed jobs, kept to decide if the next page is needed."""
+        self._page_jobs = list(super().parse_response(response))
+        return self._page_jobs
+
+    def listing_reached_start(self, context: Optional[dict]) -> bool:
+        """Return True if the last page listed jobs older than the job window.
+
+        The window starts at the jobs bookmark, or at start_date on the first
+        run. Only if all the jobs were listed the latest first so far, the next
+        pages then only list older jobs, filtered out in post_process.
+        """
+        for job in self._page_jobs:
+            updated_at = to_epoch(job["updatedAt"])
+            if self._last_listed_at is not None and updated_at > self._last_listed_at:
+                self._listed_latest_first = False
+            self._last_listed_at = updated_at
+        return (
+            self._listed_latest_first
+            and self._last_listed_at is not None
+            and self.job_window(context).is_before(self._last_listed_at)
+        )
+
+    def job_window(self, context: Optional[dict]) -> TimeWindow:
+        """Return the window of the jobs to sync, from the bookmark or start_date.
+
+        The bookmark of the account in context is parsed once, when its jobs
+        are first filtered.
+        """
+        account = self.account_name(context)
+        if self._job_windows is None:
+            self._job_windows = {}
+        if account not in self._job_windows:
+            start_date = self.get_starting_timestamp(account_context(context))
+            sync_window = self.tap.sync_window
+            self._job_windows[account] = sync_window._replace(
+                start=to_epoch(start_date) if start_date else sync_window.start
+            )
+        return self._job_windows[account]
+
+    def set_job_window(self, context: Optional[dict], window: TimeWindow) -> None:
+        """Set the window of the jobs to sync of the account in context."""
+        if self._job_windows is None:
+            self._job_windows = {}
+        self._job_windows[self.account_name(context)] = window
+
+    @staticmethod
+    def account_name(context: Optional[dict]) -> Optional[str]:
+        """Return the account of a context, None if it has no account."""
+        partition = account_context(context)
+        return partition["account"] if partition else None
+
+    @property
+    def partitions(self) -> Optional[List[dict]]:
+        """Return a partition per account if accounts is set, none otherwise."""
+        accounts = self.tap.accounts
+        if accounts is None:
+            return None
+        return [{"account": account.name} for account in accounts]
+
+    def known_jobs(self, context: Optional[dict]) -> Dict[str, str]:
+        """Return the updatedAt of the jobs synced by all the selected streams.
+
+        The index is kept in the stream state, or in the state of the account
+        partition. It is reset when streams which did not sync its jobs are
+        selected.
+        """
+        account = self.account_name(context)
+        if self._known_jobs is None:
+            self._known_jobs = {}
+        if account not in self._known_jobs:
+            index = self.get_context_state(account_context(context)).setdefault(
+                "known_jobs", {"streams": [], "jobs": {}}
+            )
+            streams = sorted(stream.name for stream in self.export_file_streams)
+            if not set(streams) <= set(index["streams"]):
+                index["jobs"] = {}
+            index["streams"] = streams
+            self._known_jobs[account] = cast(Dict[str, str], index["jobs"])
+        return self._known_jobs[account]
+
+    @property
+    def export_file_streams(self) -> List["ExportFile"]:
+        """Return the selected child streams."""
+        return [
+            child_stream
+            for child_stream in self.child_streams
+            if isinstance(child_stream, ExportFile)
+            and (child_stream.selected or child_stream.has_selected_descendents)
+        ]
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Forget the synced jobs older than the bookmark, then list the jobs.
+
+        If follow_interval is set, the jobs completed later are then listed
+        until follow_timeout. The bookmark moves past each job once its
+        children are synced.
+        """
+        self.start_listing(context)
+        latest_job_at = None
+        for job in self.list_jobs(context):
+            latest_job_at = max(latest_job_at or 0, to_epoch(job["updatedAt"]))
+            yield job
+            self.increment_bookmark(job, context)
+        if "follow_interval" in self.config:
+            for job in self.follow_jobs(context, latest_job_at):
+                yield job
+                self.increment_bookmark(job, context)
+
+    def start_listing(self, context: Optional[dict]) -> None:
+        """Read the bookmark of the account in context, and prune its synced jobs."""
+        if self._job_windows is not None:
+            self._job_windows.pop(self.account_name(context), None)
+        self.job_window(context)
+        self.prune_synced_jobs(context)
+
+    def increment_bookmark(self, job: dict, context: Optional[dict]) -> None:
+        """Move the bookmark to the job updatedAt, if the stream is not selected.
+
+        The SDK only keeps the bookmark of the selected streams, the jobs are
+        also synced for their selected child streams.
+        """
+        if not self.selected:
+            self._increment_stream_state(job, context=context)
+
+    def follow_jobs(
+        self, context: Optional[dict], latest_job_at: Optional[int]
+    ) -> Iterable[Dict[str, Any]]:
+        """Poll the job list and return the jobs completed after `latest_job_at`.
+
+        The list is polled every follow_interval seconds, the interval doubling
+        while no new job is listed, up to follow_max_interval.
+        """
+        interval = self.config["follow_interval"]
+        max_interval = self.config.get(
+            "follow_max_interval", interval * self.FOLLOW_BACKOFF_FACTOR
+        )
+        deadline = None
+        if "follow_timeout" in self.config:
+            deadline = time.monotonic() + self.config["follow_timeout"]
+        wait = interval
+        while deadline is None or time.monotonic() < deadline:
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+            self.logger.info(f"Polling the export jobs in {wait:.1f}s")
+            try:
+                time.sleep(max(wait, 0))
+            except KeyboardInterrupt:
+                self.logger.info("Follow mode interrupted, stopping")
+                return
+            if latest_job_at is not None:
+                # Only the jobs completed since the last listed one
+                window = self.job_window(context)
+                self.set_job_window(
+                    context,
+                    window._replace(start=max(window.start or 0, latest_job_at + 1)),
+                )
+            wait = min(wait * 2, max_interval)
+            for job in self.list_jobs(context):
+                latest_job_at = max(latest_job_at or 0, to_epoch(job["updatedAt"]))
+                wait = interval
+                yield job
+
+    def list_jobs(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return the listed jobs to sync.
+
+        If max_parallel_jobs is greater than 1, the files of the listed jobs are
+        downloaded in the background while the jobs are synced one by one. With
+        accounts, the jobs of all the accounts are listed first, and their files
+        are downloaded by the same workers while each account is synced.
+        """
+        max_parallel_jobs = self.config.get("max_parallel_jobs", 1)
+        if max_parallel_jobs <= 1:
+            yield from super().get_records(context)
+            return
+        try:
+            if self.prefetcher is None:
+                self.start_prefetcher(context)
+            prefetcher = cast(Prefetcher, self.prefetcher)
+            jobs = cast(dict, self._prefetched_jobs).pop(self.account_name(context), [])
+            for job in jobs:
+                yield job
+                # The children of the job are synced once it is yielded, the
+                # files left were not read, e.g. if a stream map filtered it
+                self.cancel_job_files(prefetcher, self.get_child_context(job, context))
+        except BaseException:
+            self.close_prefetcher()
+            raise
+        if not self._prefetched_jobs:
+            self.close_prefetcher()
+
+    def start_prefetcher(self, context: Optional[dict]) -> None:
+        """List the jobs of the account in context and of the accounts after it.
+
+        The files of the listed jobs start downloading in the background, in
+        the order the jobs are synced.
+        """
+        self.prefetcher = Prefetcher(max_workers=self.config["max_parallel_jobs"])
+        for child_stream in self.export_file_streams:
+            child_stream.prefetcher = self.prefetcher
+        partitions: List[Optional[dict]] = [context]
+        if context is not None and self.partitions:
+            index = self.partitions.index(context)
+            partitions = list(self.partitions[index:])
+        self._prefetched_jobs = {}
+        for partition in partitions:
+            if partition is not context:
+                self.start_listing(partition)
+            jobs = list(super().get_records(partition))
+            self._prefetched_jobs[self.account_name(partition)] = jobs
+            for job in jobs:
+                self.prefetch_job_files(
+                    self.prefetcher, self.get_child_context(job, partition)
+                )
+
+    def close_prefetcher(self) -> None:
+        """Stop the background downloads."""
+        for child_stream in self.export_file_streams:
+            child_stream.prefetcher = None
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
+        self._prefetched_jobs = None
+
+    def prefetch_job_files(self, prefetcher: Prefetcher, child_context: dict) -> None:
+        """Schedule the download of the job files the child streams will read."""
+        streams_by_url: Dict[str, List[ExportFile]] = {}
+        for child_stream in self.export_file_streams:
+            if child_stream.is_job_synced(child_context):
+                continue
+            if not child_stream.is_job_in_lookback(child_context):
+                continue
+            url = child_stream.get_url(child_context)
+            streams_by_url.setdefault(url, []).append(child_stream)
+        for url, streams in streams_by_url.items():
+            content_types = None
+            if all(
+                isinstance(stream, ExportFileConversationItemsStream)
+                for stream in streams
+            ):
+                content_types = ConversationItemsFanOut(
+                    cast(List[ExportFileConversationItemsStream], streams)
+                ).content_types
+            prefetcher.submit(
+                url,
+                functools.partial(
+                    streams[0].read_records,
+                    child_context,
+                    resume_position(streams, child_context),
+                    content_types,
+                ),
+            )
+
+    def cancel_job_files(self, prefetcher: Prefetcher, child_context: dict) -> None:
+        """Stop the downloads of the job files the child streams did not read."""
+        for child_stream in self.export_file_streams:
+            prefetcher.cancel(child_stream.get_url(child_context))
+
+    def prune_synced_jobs(self, context: Optional[dict]) -> None:
+        """Drop child state and known jobs that are older than the bookmark.
+
+        These jobs are filtered out in post_process and will never be synced
+        again, so keeping their state would only grow the state indefinitely.
+        """
+        if not self.get_starting_timestamp(context):
+            return
+        job_window = self.job_window(context)
+        known_jobs = self.known_jobs(context)
+        for job_id, updated_at in list(known_jobs.items()):
+            if job_window.is_before(updated_at):
+                del known_jobs[job_id]
+        partition = account_context(context)
+        for child_stream in self.child_streams:
+            stream_state = child_stream.stream_state
+            stream_state["partitions"] = [
+                child_partition
+                for child_partition in stream_state.get("partitions", [])
+                if account_context(child_partition["context"]) != partition
+                or not job_window.is_before(child_partition["context"]["updatedAt"])
+            ]
 
     def post_process(self, row, context):
-        """Filter jobs that finished before start_date."""
-        job_completion_date = pendulum.parse(row["updatedAt"])
-        if pendulum.parse(self.config["start_date"]) <= job_completion_date:
-            if "end_date" in self.config:
-                if pendulum.parse(self.config["end_date"]) >= job_completion_date:
-                    return row
-            else:
-                return row
+        """Filter known jobs, and jobs that finished before start_date or the bookmark.
+
+        Known jobs were synced by all the selected streams in a previous run.
+        Jobs of other shards are filtered if the sync is split in shards.
+        """
+        shard = self.tap.shard
+        if shard is not None and row["id"] not in shard:
+            return
+        if self.known_jobs(context).get(row.get("id")) == row["updatedAt"]:
+            return
+        if row["updatedAt"] in self.job_window(context):
+            return row
         return
 
     def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
-        """Return a context dictionary for child streams."""
-        return {"job_id": record["id"], "updatedAt": record["updatedAt"]}
+        """Return a context dictionary for child streams, with the job account."""
+        return {
+            **(account_context(context) or {}),
+            "job_id": record["id"],
+            "updatedAt": record["updatedAt"],
+        }
+
+    def _sync_children(self, child_context: dict) -> None:
+        """Sync child streams, downloading conversation items once per job.
+
+        Child streams which already synced the job in a previous run are skipped.
+        The state is written once the job is synced.
+        """
+        conversation_streams: List[ExportFileConversationItemsStream] = []
+        for child_stream in self.export_file_streams:
+            if child_stream.is_job_synced(child_context):
+                logging.info(
+                    f"Job id {child_context['job_id']} already synced "
+                    f"for '{child_stream.name}', skipping"
+                )
+            elif isinstance(child_stream, ExportFileConversationItemsStream):
+                conversation_streams.append(child_stream)
+            else:
+                child_stream.sync(context=child_context)
+                child_stream.mark_job_synced(child_context)
+        if conversation_streams:
+            ConversationItemsFanOut(conversation_streams).sync(child_context)
+            for child_stream in conversation_streams:
+                child_stream.mark_job_synced(child_context)
+        if self.export_file_streams:
+            known_jobs = self.known_jobs(account_context(child_context))
+            known_jobs[child_context["job_id"]] = child_context["updatedAt"]
+        if self.tap.batch_writer is not None:
+            # Batch files end with the job, before the state marking it synced
+            self.tap.batch_writer.flush()
+        self._write_state_message()
+
+
+class ExportJobsPaginator(HeaderLinkPaginator):
+    """Paginator following the Link header of the job list.
+
+    The next pages are not requested once the listing reached the jobs older
+    than the bookmark, or than the start date on the first run.
+    """
+
+    def __init__(
+        self, stream: ExportCompletedJobsStream, context: Optional[dict]
+    ) -> None:
+        """Create a paginator for the job list of `stream`, in `context`."""
+        super().__init__()
+        self.stream = stream
+        self.context = context
+
+    def has_more(self, response: requests.Response) -> bool:
+        """Return True if the next page may list jobs to sync."""
+        if "next" not in response.links:
+            return False
+        return not self.stream.listing_reached_start(self.context)
+
+
+class FilePosition(NamedTuple):
+    """Position in a job file, after the line `line` ending at byte `offset`."""
+
+    line: int
+    offset: int
+
+
+def resume_position(streams: Sequence["ExportFile"], context: dict) -> FilePosition:
+    """Return the position the streams reading the same job file resume from."""
+    return min(stream.get_checkpoint(context) for stream in streams)
 
 
 class ExportFile(gladlyStream, abc.ABC):
     """Abstract class for Job File export stream."""
 
+    # Set by the parent stream when job files are downloaded in the background
+    prefetcher: Optional[Prefetcher] = None
+
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    MAX_DOWNLOAD_ATTEMPTS = 5
+
     def get_records(self, context: Optional[Dict[Any, Any]]):
         """Get records that exists, ignoring older jobs if max_job_lookback is setup."""
         if not context:
             logging.warning("Context is empty, nothing to do")
             return []
-        period = pendulum.now().diff(pendulum.parse(context["updatedAt"])).in_days()
-        if "max_job_lookback" in self.config:
+        if self.is_job_in_lookback(context):
+            return super().get_records(context)
+        return []
+
+    def is_job_in_lookback(self, context: Dict[Any, Any]) -> bool:
+        """Return False if the job is older than max_job_lookback."""
+        window = self.tap.lookback_window
+        if window is None:
+            return True
+        updated_at = to_epoch(context["updatedAt"])
+        logging.info(f"Max job lookback is set to {self.config['max_job_lookback']}")
+        if updated_at in window:
+            return True
+        period = (now_epoch() - updated_at) // DAY
+        logging.warning(
+            f"Job id {context['job_id']} ignored because it was "
+            f"{period} > {self.config['max_job_lookback']} days ago"
+        )
+        return False
+
+    def is_duplicate(self, record: dict) -> bool:
+        """Return True if the record primary key was already emitted by the stream.
+
+        Rows of overlapping export jobs are only emitted once, if dedup_path is set.
+        Keys of each account are distinct.
+        """
+        dedup_index = self.tap.dedup_index
+        if dedup_index is None or not self.primary_keys:
+            return False
+        if len(self.primary_keys) == 1:
+            key = str(record[self.primary_keys[0]])
+        else:
+            key = json.dumps([record[name] for name in self.primary_keys], default=str)
+        stream = self.name
+        if "account" in record:
+            stream = f"{record['account']}:{stream}"
+        return not dedup_index.add(stream, key)
+
+    def _write_record_message(self, record: dict) -> None:
+        """Write the record messages, or the records to batch files if enabled."""
+        batch_writer = self.tap.batch_writer
+        if batch_writer is None:
+            super()._write_record_message(record)
+            return
+        for stream_map, mapped_record in self.map_record(record):
+            batch_writer.write(
+                stream_map.stream_alias, stream_map.transformed_schema, mapped_record
+            )
+
+    @property
+    def file_name(self) -> str:
+        """Return the name of the job file read by the stream."""
+        return self.path.rsplit("/", 1)[-1]
+
+    @property
+    def download_metrics_name(self) -> str:
+        """Return the name of the job file metrics, the file name without extension.
+
+        The conversation items file being read once for all the streams reading
+        it, its metrics are not recorded under the name of one of them.
+        """
+        return self.file_name.split(".", 1)[0]
+
+    def download_metrics(self, context: Optional[dict]) -> StreamMetrics:
+        """Return the download and parse metrics of the job file in context."""
+        job_id = context.get("job_id") if context else None
+        return self.tap.metrics.get(self.download_metrics_name, job_id)
+
+    def request_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Return the job file records, resuming after the last emitted line.
+
+        The position of the last emitted line is checkpointed in the job state,
+        so an interrupted sync continues from there on the next run.
+        """
+        context = cast(dict, context)
+        state = self.get_context_state(context)
+        for record, position in self.read_positioned_records(
+            context, self.get_checkpoint(context)
+        ):
+            yield record
+            state["checkpoint"] = {"line": position.line, "offset": position.offset}
+
+    def read_positioned_records(
+        self,
+        context: dict,
+        start: FilePosition,
+        content_types: Optional[FrozenSet[bytes]] = None,
+    ) -> Iterable[Tuple[dict, FilePosition]]:
+        """Return the records from `start`, downloaded in background if prefetched."""
+        records: Optional[Iterable[Tuple[dict, FilePosition]]] = None
+        if self.prefetcher:
+            records = self.prefetcher.pop(self.get_url(context))
+        if records is None:
+            records = self.read_records(context, start, content_types)
+        return records
+
+    def read_records(
+        self,
+        context: dict,
+        start: FilePosition,
+        content_types: Optional[FrozenSet[bytes]] = None,
+    ) -> Iterator[Tuple[dict, FilePosition]]:
+        """Read the job file from `start`, return its records and their position.
+
+        If `content_types` is set, lines of conversation items of other (lower
+        case) content types are skipped without being decoded.
+        """
+        if start.line:
             logging.info(
-                f"Max job lookback is set to {self.config['max_job_lookback']}"
+                f"Resuming {self.file_name} of job id {context['job_id']} "
+                f"after line {start.line}"
             )
-            if period <= self.config["max_job_lookback"]:
-                logging.info(
-                    f"{period} <= {self.config['max_job_lookback']}, syncing ..."
-                )
-                return super().get_records(context)
-            else:
+        metrics = self.download_metrics(context)
+        line_number, offset = start
+        for line in self.read_lines(context, offset):
+            line_number += 1
+            offset += len(line) + 1
+            if content_types is not None:
+                content_type = peek_content_type(line)
+                if content_type and content_type.lower() not in content_types:
+                    metrics.prefiltered_lines += 1
+                    continue
+            position = FilePosition(line_number, offset)
+            parse_start = time.perf_counter()
+            records = decode_records(line, self.records_jsonpath)
+            metrics.parse_seconds += time.perf_counter() - parse_start
+            metrics.parsed_lines += 1
+            for record in records:
+                yield record, position
+
+    def read_lines(self, context: dict, offset: int = 0) -> Iterator[bytes]:
+        """Return the job file lines, from the export file cache if enabled."""
+        cache = self.tap.export_file_cache
+        if cache is None:
+            return self.download_lines(context, offset)
+        lines = cache.read_lines(context["job_id"], self.file_name, offset)
+        if lines is None and offset:
+            # The cache only holds complete files
+            lines = self.download_lines(context, offset)
+        elif lines is None:
+            lines = cache.write_lines(
+                context["job_id"],
+                self.file_name,
+                self.download_lines(context),
+                updated_at=to_epoch(context["updatedAt"]),
+            )
+        return lines
+
+    def download_lines(self, context: dict, offset: int = 0) -> Iterator[bytes]:
+        """Download the job file from byte `offset` and return its lines.
+
+        If the connection drops, the download resumes where it stopped instead
+        of starting over.
+        """
+        for attempt in range(1, self.MAX_DOWNLOAD_ATTEMPTS + 1):
+            response = self.request_file(context, offset)
+            # Skip the lines already read if the server ignored the range header
+            skip = offset if response.status_code == 200 else 0
+            try:
+                for line in self.iter_response_lines(response, context, skip):
+                    offset += len(line) + 1
+                    yield line
+                return
+            except (
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ConnectionError,
+            ) as ex:
+                if attempt == self.MAX_DOWNLOAD_ATTEMPTS:
+                    raise
                 logging.warning(
-                    f"Job id {context['job_id']} ignored because it was "
-                    f"{period} > {self.config['max_job_lookback']} days ago"
+                    f"Download of {self.file_name} for job id {context['job_id']} "
+                    f"interrupted at byte {offset} ({ex}), resuming..."
                 )
-                return []
-        else:
-            return super().get_records(context)
+
+    def request_file(self, context: dict, offset: int) -> requests.Response:
+        """Request the job file from byte `offset`."""
+        prepared_request = self.prepare_request(context, next_page_token=None)
+        if offset:
+            prepared_request.headers["Range"] = f"bytes={offset}-"
+            # The offset counts decoded bytes, the range must not be compressed
+            prepared_request.headers["Accept-Encoding"] = "identity"
+        response = self.request_decorator(self._request)(prepared_request, context)
+        self.update_sync_costs(prepared_request, response, context)
+        return response
+
+    def iter_response_lines(
+        self, response: requests.Response, context: dict, skip: int = 0
+    ) -> Iterator[bytes]:
+        """Return the lines of the response body, ignoring its first `skip` bytes."""
+        if response.status_code == 416:
+            # Range not satisfiable, the whole file was read already
+            return
+        pending: List[bytes] = []
+        chunks = self.download_metrics(context).iter_timed_chunks(
+            response.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE)
+        )
+        for chunk in chunks:
+            if skip:
+                if len(chunk) <= skip:
+                    skip -= len(chunk)
+                    continue
+                chunk, skip = chunk[skip:], 0
+            lines = chunk.split(b"\n")
+            if len(lines) == 1:
+                pending.append(chunk)
+                continue
+            pending.append(lines[0])
+            yield b"".join(pending)
+            yield from lines[1:-1]
+            pending = [lines[-1]]
+        last_line = b"".join(pending)
+        if last_line:
+            yield last_line
+
+    def validate_response(self, response: requests.Response) -> None:
+        """Accept range not satisfiable responses, when resuming a complete file."""
+        if response.status_code != 416:
+            super().validate_response(response)
+
+    def get_checkpoint(self, context: dict) -> FilePosition:
+        """Return the position of the last line emitted for the job."""
+        checkpoint = self.get_context_state(context).get("checkpoint")
+        if not checkpoint:
+            return FilePosition(0, 0)
+        return FilePosition(checkpoint["line"], checkpoint["offset"])
+
+    def is_job_synced(self, context: dict) -> bool:
+        """Return True if the job files were fully synced by a previous run."""
+        return self.get_context_state(context).get("synced", False)
+
+    def mark_job_synced(self, context: dict) -> None:
+        """Record in the job state that its files were fully synced."""
+        state = self.get_context_state(context)
+        state["synced"] = True
+        state.pop("checkpoint", None)
 
 
 class ExportFileTopicsStream(ExportFile):
@@ -78,32 +721,7 @@ class ExportFileTopicsStream(ExportFile):
     primary_keys = ["id"]
     replication_key = None
     parent_stream_type = ExportCompletedJobsStream
-    ignore_parent_replication_key = True
-    schema_filepath = SCHEMAS_DIR / "export_topics.json"
-
-    def parse_response(self, response: requests.Response) -> Iterable[dict]:
-        """Parse the response and return an iterator of result records."""
-        for line in response.iter_lines():
-            yield from extract_jsonpath(self.records_jsonpath, input=json.loads(line))
-
-
-class ExportFileConversationItemsAllTypesStream(ExportFile):
-    """Stream with all the conversations and content type."""
-
-    name = "conversation_all_types"
-    path = "/export/jobs/{job_id}/files/conversation_items.jsonl"
-    primary_keys = ["id"]
-    replication_key = None
-    parent_stream_type = ExportCompletedJobsStream
-    ignore_parent_replication_key = True
-    schema_filepath = SCHEMAS_DIR / "export_conversation-all_types.json"
-
-    def parse_response(self, response: requests.Response) -> Iterable[dict]:
-        """Parse the response and return an iterator of result records."""
-        for line in response.iter_lines():
-            record = json.loads(line)
-            record["content"] = {"type": record["content"]["type"]}
-            yield from extract_jsonpath(self.records_jsonpath, input=record)
+    schema_file = "export_topics.json"
 
 
 class ExportFileConversationItemsStream(ExportFile, abc.ABC):
@@ -114,150 +732,445 @@ class ExportFileConversationItemsStream(ExportFile, abc.ABC):
     primary_keys = ["id"]
     replication_key = None
     parent_stream_type = ExportCompletedJobsStream
-    ignore_parent_replication_key = True
+    content_type: Optional[str] = None
 
-    @property
-    def schema_filepath(self):
-        """Return schema filepath by content type."""
-        schemas_mapping = {
-            "chat_message": "export_conversation-chat_message.json",
-            "conversation_note": "export_conversation-conversation_note.json",
-            "topic_change": "export_conversation-topic_change.json",
-            "sms": "export_conversation-topic_change.json",
-            "conversation_status_change": "export_conversation-conversation_status_change.json",  # noqa
-            "phone_call": "export_conversation-phone_call.json",
-            "voicemail": "export_conversation-voicemail.json",
-            "customer_activity": "export_conversation-customer_activity.json",
-            "facebook_message": "export_conversation-facebook_message.json",
-            "twitter": "export_conversation-twitter.json",
-            "instagram_direct": "export_conversation-instagram_direct.json",
-            "whatsapp": "export_conversation-whatsapp.json",
-            "email": "export_conversation-email.json",
-        }
+    # Contents larger than offload_threshold_bytes are written to side files
+    offloads_content = True
 
-        try:
-            return SCHEMAS_DIR / schemas_mapping[self.content_type.lower()]
-        except KeyError:
-            raise exceptions.ConfigValidationError(
-                "content_type config parameter is required for export "
-                "conversations streams"
-            )
+    @classmethod
+    def extend_schema(cls, schema: dict, config: Mapping[str, Any]) -> dict:
+        """Add the reference to the offloaded content, if offload_dir is set.
 
-    def parse_response(self, response: requests.Response) -> Iterable[dict]:
-        """Parse the response and return an iterator of result records."""
-        for line in response.iter_lines():
-            yield from extract_jsonpath(self.records_jsonpath, input=json.loads(line))
+        The properties of an offloaded content are then optional, except its type.
+        """
+        schema = super().extend_schema(schema, config)
+        if not cls.offloads_content or "offload_dir" not in config:
+            return schema
+        properties = dict(schema["properties"], content_ref=PAYLOAD_REF_SCHEMA)
+        content = dict(properties["content"])
+        if "required" in content:
+            content["required"] = [
+                name for name in content["required"] if name == "type"
+            ]
+        properties["content"] = content
+        return dict(schema, properties=properties)
 
     def post_process(self, row, context):
         """Filter rows by content type."""
         if row["content"]["type"].lower() == self.content_type.lower():
             return row
 
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return the records, offloading their large contents."""
+        for record in super().get_records(context):
+            yield self.offload_content(record, context)
 
-class ExportFileConversationItemsChatMessage(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is chat_message."""
-
-    name = "conversation_chat_message"
-    content_type = "chat_message"
-
-
-class ExportFileConversationItemsConversationNote(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is conversation_note."""
-
-    name = "conversation_conversation_note"
-    content_type = "conversation_note"
-
-
-class ExportFileConversationItemsTopicChange(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is topic_change."""
-
-    name = "conversation_topic_change"
-    content_type = "topic_change"
+    def offload_content(
+        self, record: dict, context: Optional[dict], size_hint: Optional[int] = None
+    ) -> dict:
+        """Write the record content to a side file if larger than the threshold.
 
+        The content then only keeps its type, and content_ref references the
+        side file. The content is not serialized if `size_hint`, the size of
+        the line of the record, is below the threshold.
+        """
+        offloader = self.tap.payload_offloader
+        if offloader is None or not self.offloads_content:
+            return record
+        if size_hint is not None and size_hint < offloader.threshold_bytes:
+            return record
+        reference = offloader.offload(record["content"])
+        if reference is None:
+            return record
+        self.metrics(context).offloaded_payloads += 1
+        record = dict(record)
+        record["content"] = {"type": record["content"]["type"]}
+        record["content_ref"] = reference
+        return record
+
+    def start_fan_out(self, context: dict) -> None:
+        """Start syncing a job whose rows are pushed by ConversationItemsFanOut."""
+        self.logger.info(
+            f"Beginning {self.replication_method.lower()} sync of '{self.name}' "
+            f"with context: {context}..."
+        )
+        if self.selected:
+            self._write_schema_message()
+        self.get_context_state(context)
+        self._fan_out_record_count = 0
+
+    def fan_out_record(self, row: dict, context: dict, line_size: int) -> None:
+        """Write a row dispatched by ConversationItemsFanOut, of a line_size line."""
+        record = self.post_process(row, context)
+        if record is None:
+            self.metrics(context).filtered_rows += 1
+            return
+        record = self.tag_record(record, context)
+        if self.is_duplicate(record):
+            self.metrics(context).duplicate_rows += 1
+            return
+        self._check_max_record_limit(self._fan_out_record_count)
+        self._write_record_message(self.offload_content(record, context, line_size))
+        self._fan_out_record_count += 1
+
+    def finish_fan_out(self, context: dict) -> None:
+        """Finish syncing a job whose rows are pushed by ConversationItemsFanOut."""
+        self._write_record_count_log(
+            record_count=self._fan_out_record_count, context=context
+        )
+        self._write_state_message()
+
+
+class ExportFileConversationItemsAllTypesStream(ExportFileConversationItemsStream):
+    """Stream with all the conversations and content type."""
 
-class ExportFileConversationItemsSms(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is sms."""
+    name = "conversation_all_types"
+    schema_file = "export_conversation-all_types.json"
+    # Only the content type is kept
+    offloads_content = False
 
-    name = "conversation_sms"
-    content_type = "sms"
+    def post_process(self, row, context):
+        """Keep the content type only, the content itself varies by type."""
+        # Rows are shared with the content type streams, so copy rather than mutate
+        record = dict(row)
+        record["content"] = {"type": row["content"]["type"]}
+        return record
 
 
-class ExportFileConversationItemsConversationStatusChange(
-    ExportFileConversationItemsStream
-):
-    """Export conversation items stream.
+class ConversationItemsFanOut:
+    """Download a job's conversation items once and dispatch rows by content type.
 
-    Where content type is conversation_status_change.
+    Every conversation items stream reads the same conversation_items.jsonl file,
+    so instead of each stream downloading and parsing it, the file is read once
+    and every row is pushed to the streams interested in its content type.
     """
 
-    name = "conversation_conversation_status_change"
-    content_type = "conversation_status_change"
-
-
-class ExportFileConversationItemsPhoneCall(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is phone_call."""
-
-    name = "conversation_phone_call"
-    content_type = "phone_call"
-
-
-class ExportFileConversationItemsVoiceMail(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is voicemail."""
-
-    name = "conversation_voicemail"
-    content_type = "voicemail"
-
-
-class ExportFileConversationItemsCustomerActivity(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is voicemail."""
-
-    name = "conversation_customer_activity"
-    content_type = "customer_activity"
-
-
-class ExportFileConversationItemsFacebookMessage(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is voicemail."""
-
-    name = "conversation_facebook_message"
-    content_type = "facebook_message"
-
+    def __init__(self, streams: List[ExportFileConversationItemsStream]) -> None:
+        """Group the streams by the content type they are interested in."""
+        self.streams = streams
+        self.all_types_streams: List[ExportFileConversationItemsStream] = []
+        self.streams_by_type: Dict[str, List[ExportFileConversationItemsStream]] = {}
+        for stream in streams:
+            if stream.content_type is None:
+                self.all_types_streams.append(stream)
+            else:
+                self.streams_by_type.setdefault(stream.content_type.lower(), []).append(
+                    stream
+                )
 
-class ExportFileConversationItemsTwitter(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is voicemail."""
+    @property
+    def content_types(self) -> Optional[FrozenSet[bytes]]:
+        """Return the content types to decode, None if all of them are needed."""
+        if self.all_types_streams:
+            return None
+        return frozenset(content_type.encode() for content_type in self.streams_by_type)
 
-    name = "conversation_twitter"
-    content_type = "twitter"
+    def sync(self, context: dict) -> None:
+        """Sync the job's conversation items for all the streams.
 
+        The streams are profiled as one, the file being read once for all.
+        """
+        with self.streams[0].profile("conversation_items"):
+            self.sync_streams(context)
 
-class ExportFileConversationItemsInstagramDirect(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is voicemail."""
+    def sync_streams(self, context: dict) -> None:
+        """Sync the job's conversation items for all the streams.
 
-    name = "conversation_instagram_direct"
-    content_type = "instagram_direct"
+        Each stream resumes after its own checkpoint, the file is read from the
+        earliest one and the checkpoints are saved every STATE_MSG_FREQUENCY rows.
+        """
+        reader = self.streams[0]
+        for stream in self.streams:
+            stream.start_fan_out(context)
+        if reader.is_job_in_lookback(context):
+            start_lines = {
+                stream.name: stream.get_checkpoint(context).line
+                for stream in self.streams
+            }
+            start = resume_position(self.streams, context)
+            position = start
+            line_start = start.offset
+            for row_count, (row, row_position) in enumerate(
+                reader.read_positioned_records(context, start, self.content_types),
+                1,
+            ):
+                if row_position != position:
+                    line_start, position = position.offset, row_position
+                for stream in self.streams_for(row):
+                    # Rows up to the checkpoint were written by a previous run
+                    if position.line > start_lines[stream.name]:
+                        stream.fan_out_record(
+                            row, context, line_size=position.offset - line_start
+                        )
+                if row_count % reader.STATE_MSG_FREQUENCY == 0:
+                    self.checkpoint(context, position)
+            if position != start:
+                self.checkpoint(context, position)
+        for stream in self.streams:
+            stream.finish_fan_out(context)
+        reader.write_metrics(
+            reader.download_metrics_name, reader.download_metrics(context), context
+        )
+
+    def streams_for(self, row: dict) -> Iterator[ExportFileConversationItemsStream]:
+        """Return the streams interested in the row content type."""
+        yield from self.all_types_streams
+        yield from self.streams_by_type.get(row["content"]["type"].lower(), ())
+
+    def checkpoint(self, context: dict, position: FilePosition) -> None:
+        """Save in the state of every stream that the file was read to `position`."""
+        for stream in self.streams:
+            state = stream.get_context_state(context)
+            if position.line > state.get("checkpoint", {}).get("line", 0):
+                state["checkpoint"] = {
+                    "line": position.line,
+                    "offset": position.offset,
+                }
+        self.streams[0]._write_state_message()
+
+
+def conversation_content_types() -> List[str]:
+    """Return the content types of conversation items with a schema file."""
+    return sorted(
+        path.stem.replace(CONVERSATION_SCHEMA_PREFIX, "", 1)
+        for path in SCHEMAS_DIR.glob(f"{CONVERSATION_SCHEMA_PREFIX}*.json")
+        if path.stem != f"{CONVERSATION_SCHEMA_PREFIX}all_types"
+    )
+
+
+def conversation_items_stream_type(
+    content_type: str,
+) -> Type[ExportFileConversationItemsStream]:
+    """Return a stream class for the conversation items of `content_type`."""
+    class_name = "ExportFileConversationItems" + "".join(
+        part.capitalize() for part in content_type.split("_")
+    )
+    return type(
+        class_name,
+        (ExportFileConversationItemsStream,),
+        {
+            "__doc__": "Export conversation items stream where content type is "
+            f"{content_type}.",
+            "__module__": __name__,
+            "name": f"conversation_{content_type}",
+            "content_type": content_type,
+            "schema_file": f"{CONVERSATION_SCHEMA_PREFIX}{content_type}.json",
+        },
+    )
+
+
+# A stream per content type, adding one only needs its schema file
+CONVERSATION_ITEMS_STREAM_TYPES: Dict[str, Type[ExportFileConversationItemsStream]] = {
+    content_type: conversation_items_stream_type(content_type)
+    for content_type in conversation_content_types()
+}
+
+# Former names of the content type stream classes
+ExportFileConversationItemsChatMessage = CONVERSATION_ITEMS_STREAM_TYPES["chat_message"]
+ExportFileConversationItemsConversationNote = CONVERSATION_ITEMS_STREAM_TYPES[
+    "conversation_note"
+]
+ExportFileConversationItemsTopicChange = CONVERSATION_ITEMS_STREAM_TYPES["topic_change"]
+ExportFileConversationItemsSms = CONVERSATION_ITEMS_STREAM_TYPES["sms"]
+ExportFileConversationItemsConversationStatusChange = CONVERSATION_ITEMS_STREAM_TYPES[
+    "conversation_status_change"
+]
+ExportFileConversationItemsPhoneCall = CONVERSATION_ITEMS_STREAM_TYPES["phone_call"]
+ExportFileConversationItemsVoiceMail = CONVERSATION_ITEMS_STREAM_TYPES["voicemail"]
+ExportFileConversationItemsCustomerActivity = CONVERSATION_ITEMS_STREAM_TYPES[
+    "customer_activity"
+]
+ExportFileConversationItemsFacebookMessage = CONVERSATION_ITEMS_STREAM_TYPES[
+    "facebook_message"
+]
+ExportFileConversationItemsTwitter = CONVERSATION_ITEMS_STREAM_TYPES["twitter"]
+ExportFileConversationItemsInstagramDirect = CONVERSATION_ITEMS_STREAM_TYPES[
+    "instagram_direct"
+]
+ExportFileConversationItemsWhatsapp = CONVERSATION_ITEMS_STREAM_TYPES["whatsapp"]
+ExportFileConversationItemsEmail = CONVERSATION_ITEMS_STREAM_TYPES["email"]
 
 
-class ExportFileConversationItemsWhatsapp(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is voicemail."""
+class ReportsConversationTimestampsReportStream(gladlyStream):
+    """gladly stream class for Conversation Timestamps Report.
+
+    The date range is split in windows of report_window_days, each requested
+    separately as a stream partition. The days of a window which are over
+    are only requested once: the window state keeps the day its sync ended
+    at, and the window is marked as synced once all its days are. The windows
+    synced from the start are then merged in the syncedUntil bookmark of the
+    stream, or of the account, and only the windows after it are partitions.
+    """
 
-    name = "conversation_whatsapp"
-    content_type = "whatsapp"
+    rest_method = "POST"
 
+    name = "reports__conversation_timestamps_report"
+    path = "/reports"
+    schema_file = "reports__conversation_timestamps_report.json"
 
-class ExportFileConversationItemsEmail(ExportFileConversationItemsStream):
-    """Export conversation items stream where content type is voicemail."""
+    DEFAULT_WINDOW_DAYS = 7
 
-    name = "conversation_email"
-    content_type = "email"
+    # Set while windows are requested in the background
+    prefetcher: Optional[Prefetcher] = None
 
+    # Report windows of the tap shard, and the day they end at
+    _windows: Optional[List[dict]] = None
+    _end_day: Optional[date] = None
 
-class ReportsConversationTimestampsReportStream(gladlyStream):
-    """gladly stream class for Conversation Timestamps Report."""
+    @property
+    def end_day(self) -> date:
+        """Return the day the report ends at, excluded: end_date or today.
 
-    rest_method = "POST"
+        Today is read once, so that a sync running past midnight requests
+        and marks as synced the same days.
+        """
+        if self._end_day is None:
+            end = self.tap.sync_window.end
+            self._end_day = epoch_date(end if end is not None else now_epoch())
+        return self._end_day
 
-    name = "reports__conversation_timestamps_report"
-    path = "/reports"
-    schema_filepath = SCHEMAS_DIR / "reports__conversation_timestamps_report.json"
+    @property
+    def partitions(self) -> List[dict]:
+        """Return the report windows of report_window_days days, from start_date.
+
+        A window includes its startAt day and excludes its endAt day. The last
+        window ends at end_date if set, otherwise it ends in the future and
+        its days are requested as they are over. Only the windows of the tap
+        shard are returned if the sync is split. The windows are repeated for
+        each account if accounts is set.
+        """
+        if self._windows is None:
+            window_days = timedelta(
+                days=self.config.get("report_window_days", self.DEFAULT_WINDOW_DAYS)
+            )
+            sync_window = self.tap.sync_window
+            shard = self.tap.shard
+            self._windows = []
+            day = epoch_date(cast(int, sync_window.start))
+            while day < self.end_day:
+                window_end = day + window_days
+                if sync_window.end is not None:
+                    window_end = min(window_end, self.end_day)
+                window = {"startAt": day.isoformat(), "endAt": window_end.isoformat()}
+                if shard is None or window["startAt"] in shard:
+                    self._windows.append(window)
+                day = window_end
+        if self.tap.accounts is None:
+            windows = self._windows
+        else:
+            windows = [
+                {"account": account.name, **window}
+                for account in self.tap.accounts
+                for window in self._windows
+            ]
+        return [
+            window for window in windows if window["endAt"] > self.synced_until(window)
+        ]
+
+    def synced_until(self, window: dict) -> str:
+        """Return the day the windows of the window account are all synced until."""
+        return self.get_context_state(account_context(window)).get("syncedUntil", "")
+
+    def request_context(self, window: dict) -> dict:
+        """Return the context of the window request, with the days left to sync.
+
+        The days before syncedUntil were synced by a previous run, the days
+        from the end day are not over yet.
+        """
+        synced_until = max(
+            self.get_context_state(window).get("syncedUntil", ""),
+            self.synced_until(window),
+        )
+        return dict(
+            window,
+            startAt=max(window["startAt"], synced_until),
+            endAt=min(window["endAt"], self.end_day.isoformat()),
+        )
+
+    def is_window_synced(self, window: dict) -> bool:
+        """Return True if no day of the window is left to sync for now."""
+        if self.get_context_state(window).get("synced"):
+            return True
+        request_context = self.request_context(window)
+        return request_context["startAt"] >= request_context["endAt"]
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return the records of the window days left, then mark them synced."""
+        if context is None:
+            # The SDK syncs without context if no window belongs to the shard
+            return
+        if self.is_window_synced(context):
+            self.logger.info(f"Report window {context} already synced, skipping")
+            return
+        request_context = self.request_context(context)
+        yield from super().get_records(context)
+        # The requested days are over, their rows are final
+        state = self.get_context_state(context)
+        state["syncedUntil"] = request_context["endAt"]
+        if state["syncedUntil"] == context["endAt"]:
+            state["synced"] = True
+            self.merge_synced_windows(context)
+
+    def merge_synced_windows(self, context: dict) -> None:
+        """Merge the state of the windows synced from the start into syncedUntil.
+
+        The state then only keeps the windows after syncedUntil, instead of
+        one partition per window since start_date.
+        """
+        account = account_context(context)
+        account_state = self.get_context_state(account)
+        synced_until = account_state.get("syncedUntil", "")
+        for window in self.partitions:
+            if account_context(window) != account:
+                continue
+            if not self.get_context_state(window).get("synced"):
+                break
+            synced_until = window["endAt"]
+        if synced_until == account_state.get("syncedUntil", ""):
+            return
+        account_state["syncedUntil"] = synced_until
+        self.stream_state["partitions"] = [
+            partition
+            for partition in self.stream_state.get("partitions", [])
+            if account_context(partition["context"]) != account
+            or "endAt" not in partition["context"]
+            or partition["context"]["endAt"] > synced_until
+        ]
+
+    def request_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Return the records of the window days left to sync.
+
+        The next windows are requested in background if max_parallel_reports
+        is greater than 1.
+        """
+        context = cast(dict, context)
+        if self.config.get("max_parallel_reports", 1) <= 1:
+            yield from super().request_records(self.request_context(context))
+            return
+        if self.prefetcher is None:
+            self.prefetcher = Prefetcher(self.config["max_parallel_reports"])
+            for window in self.partitions:
+                if not self.is_window_synced(window):
+                    self.prefetcher.submit(
+                        tuple(window.items()),
+                        functools.partial(
+                            super().request_records, self.request_context(window)
+                        ),
+                    )
+        records = self.prefetcher.pop(tuple(context.items()))
+        try:
+            yield from records or super().request_records(self.request_context(context))
+        except BaseException:
+            self.close_prefetcher()
+            raise
+        if not self.prefetcher:
+            self.close_prefetcher()
+
+    def close_prefetcher(self) -> None:
+        """Stop the background requests."""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
 
     def prepare_request_payload(
         self, context: Optional[dict], next_page_token: Optional[Any]
@@ -266,24 +1179,22 @@ class ReportsConversationTimestampsReportStream(gladlyStream):
 
         By default, no payload will be sent (return None).
         """
+        context = cast(dict, context)
         payload: dict = {
             "metricSet": "ConversationTimestampsReport",
-            "startAt": pendulum.parse(self.config["start_date"]).format(  # type: ignore
-                "YYYY-MM-DD"
-            ),
-            "endAt": (
-                pendulum.parse(self.config["end_date"])
-                if "end_date" in self.config
-                else pendulum.now()
-            ).format(  # type: ignore
-                "YYYY-MM-DD"
-            ),
+            "startAt": context["startAt"],
+            "endAt": context["endAt"],
             "timezone": "UTC",
         }
 
         return payload
 
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
-        """Parse the response and return an iterator of result records."""
-        gen_decoded_response = (line.decode("utf-8") for line in response.iter_lines())
-        yield from csv.DictReader(gen_decoded_response)
+        """Parse the CSV response as it is downloaded."""
+        # Undo the Content-Encoding, as the body is read without requests
+        response.raw.decode_content = True
+        # Keep the body open at its end, where io.TextIOWrapper reads it again
+        response.raw.auto_close = False
+        yield from iter_csv_records(
+            cast(IO[bytes], response.raw), self.schema, self.metrics(None)
+        )
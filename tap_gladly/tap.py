@@ -1,47 +1,41 @@
 """gladly tap class."""
 
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Optional, Type, cast
 
+import requests
+import singer
+from requests.adapters import HTTPAdapter
+from singer import StateMessage
 from singer_sdk import Stream, Tap
 from singer_sdk import typing as th  # JSON schema typing helpers
+from singer_sdk.authenticators import BasicAuthenticator
+from singer_sdk.streams import RESTStream
+
+from tap_gladly.accounts import Account
+from tap_gladly.batch import BatchConfig, BatchWriter
+from tap_gladly.cache import ExportFileCache
+from tap_gladly.dedup import DedupIndex
+from tap_gladly.metrics import MetricsRecorder
+from tap_gladly.offload import PayloadOffloader
+from tap_gladly.profiling import Profiler
+from tap_gladly.scheduler import RequestScheduler
+from tap_gladly.sharding import Shard
 
 # TODO: Import your custom stream types here:
 from tap_gladly.streams import (
+    CONVERSATION_ITEMS_STREAM_TYPES,
     ExportCompletedJobsStream,
     ExportFileConversationItemsAllTypesStream,
-    ExportFileConversationItemsChatMessage,
-    ExportFileConversationItemsConversationNote,
-    ExportFileConversationItemsConversationStatusChange,
-    ExportFileConversationItemsCustomerActivity,
-    ExportFileConversationItemsEmail,
-    ExportFileConversationItemsFacebookMessage,
-    ExportFileConversationItemsInstagramDirect,
-    ExportFileConversationItemsPhoneCall,
-    ExportFileConversationItemsSms,
-    ExportFileConversationItemsTopicChange,
-    ExportFileConversationItemsTwitter,
-    ExportFileConversationItemsVoiceMail,
-    ExportFileConversationItemsWhatsapp,
     ExportFileTopicsStream,
     ReportsConversationTimestampsReportStream,
 )
+from tap_gladly.timewindow import TimeWindow, lookback_window
 
-STREAM_TYPES = [
+STREAM_TYPES: List[Type[Stream]] = [
     ExportCompletedJobsStream,
-    ExportFileConversationItemsChatMessage,
-    ExportFileConversationItemsConversationNote,
-    ExportFileConversationItemsTopicChange,
-    ExportFileConversationItemsSms,
-    ExportFileConversationItemsConversationStatusChange,
-    ExportFileConversationItemsPhoneCall,
-    ExportFileConversationItemsVoiceMail,
+    *CONVERSATION_ITEMS_STREAM_TYPES.values(),
     ExportFileTopicsStream,
-    ExportFileConversationItemsCustomerActivity,
-    ExportFileConversationItemsFacebookMessage,
-    ExportFileConversationItemsTwitter,
-    ExportFileConversationItemsInstagramDirect,
-    ExportFileConversationItemsWhatsapp,
-    ExportFileConversationItemsEmail,
     ReportsConversationTimestampsReportStream,
     ExportFileConversationItemsAllTypesStream,
 ]
@@ -52,6 +46,25 @@ class Tapgladly(Tap):
 
     name = "tap-gladly"
 
+    _export_file_cache: Optional[ExportFileCache] = None
+    _metrics: Optional[MetricsRecorder] = None
+    _requests_session: Optional[requests.Session] = None
+    _authenticator: Optional[BasicAuthenticator] = None
+    _scheduler: Optional[RequestScheduler] = None
+    _sync_window: Optional[TimeWindow] = None
+    _lookback_window: Optional[TimeWindow] = None
+    _batch_writer: Optional[BatchWriter] = None
+    _dedup_index: Optional[DedupIndex] = None
+    _shard: Optional[Shard] = None
+    _payload_offloader: Optional[PayloadOffloader] = None
+    _profiler: Optional[Profiler] = None
+    _accounts: Optional[Dict[str, Account]] = None
+
+    # Connections kept open to the API, unless more are downloaded in parallel
+    DEFAULT_HTTP_POOL_SIZE = 10
+
+    DEFAULT_OFFLOAD_THRESHOLD_BYTES = 1024 * 1024
+
     # TODO: Update this section with the actual config values you expect:
     config_jsonschema = th.PropertiesList(
         th.Property(
@@ -91,6 +104,196 @@ class Tapgladly(Tap):
             "the tap does not try to fetch the export files as it assumes they"
             " do not exist.",
         ),
+        th.Property(
+            "max_parallel_jobs",
+            th.IntegerType,
+            required=False,
+            description="Maximum number of export job files downloaded at the same"
+            " time, defaults to 1 (no background downloads).",
+        ),
+        th.Property(
+            "cache_dir",
+            th.StringType,
+            required=False,
+            description="Directory where export job files are cached, files are"
+            " downloaded again on every run if not set.",
+        ),
+        th.Property(
+            "cache_max_size_mb",
+            th.IntegerType,
+            required=False,
+            description="Maximum size of the export job files cache, the oldest"
+            " files are evicted first. Files older than max_job_lookback are"
+            " always evicted.",
+        ),
+        th.Property(
+            "report_window_days",
+            th.IntegerType,
+            required=False,
+            description="Number of days covered by each request to the reports"
+            " API, defaults to 7. Windows which are over are not requested again.",
+        ),
+        th.Property(
+            "max_parallel_reports",
+            th.IntegerType,
+            required=False,
+            description="Maximum number of report windows requested at the same"
+            " time, defaults to 1.",
+        ),
+        th.Property(
+            "metrics_summary_path",
+            th.StringType,
+            required=False,
+            description="Path of a JSON file where the performance metrics of each"
+            " stream and export job are written, updated as the sync progresses.",
+        ),
+        th.Property(
+            "http_pool_size",
+            th.IntegerType,
+            required=False,
+            description="Maximum number of connections kept open to the API, shared"
+            " by all the streams. Defaults to 10, or max_parallel_jobs plus"
+            " max_parallel_reports if larger.",
+        ),
+        th.Property(
+            "max_requests_per_second",
+            th.NumberType,
+            required=False,
+            description="Maximum number of requests sent to the API per second by"
+            " all the streams, not limited by default. Requests are paused anyway"
+            " when the API throttles them or its rate limit is reached.",
+        ),
+        th.Property(
+            "max_concurrent_requests",
+            th.IntegerType,
+            required=False,
+            description="Maximum number of requests sent to the API at the same"
+            " time, defaults to http_pool_size. Halved when the API throttles a"
+            " request, then increased again as requests succeed.",
+        ),
+        th.Property(
+            "batch_config",
+            th.ObjectType(
+                th.Property(
+                    "encoding",
+                    th.ObjectType(
+                        th.Property("format", th.StringType),
+                        th.Property("compression", th.StringType),
+                    ),
+                ),
+                th.Property(
+                    "storage",
+                    th.ObjectType(
+                        th.Property("root", th.StringType),
+                        th.Property("prefix", th.StringType),
+                    ),
+                ),
+                th.Property("batch_size", th.IntegerType),
+            ),
+            required=False,
+            description="Write the export file streams records to local batch files"
+            " announced by BATCH messages, instead of RECORD messages. Format"
+            ' "jsonl" (compression "gzip" or "none") or "parquet" (compression'
+            ' "snappy", "gzip" or "none", requires pyarrow), file:// storage root'
+            " and batch_size records per file, 100000 by default.",
+        ),
+        th.Property(
+            "dedup_path",
+            th.StringType,
+            required=False,
+            description="Path of a SQLite file indexing the primary keys emitted by"
+            " the export file streams, across export jobs and runs. Rows whose"
+            " primary key was already emitted by the stream are dropped, the first"
+            " version of a row is kept. Keys emitted more than max_job_lookback"
+            " days ago are evicted.",
+        ),
+        th.Property(
+            "shard_index",
+            th.IntegerType,
+            required=False,
+            description="Index of the shard synced by the tap, from 0 to"
+            " shard_count - 1. Export jobs and report windows are split across the"
+            " shards by a stable hash, each shard syncing its own with its own"
+            " state. Merge the shard states with tap-gladly-merge-states.",
+        ),
+        th.Property(
+            "shard_count",
+            th.IntegerType,
+            required=False,
+            description="Number of shards the sync is split into, set with"
+            " shard_index.",
+        ),
+        th.Property(
+            "follow_interval",
+            th.NumberType,
+            required=False,
+            description="Keep listing the export jobs after the sync, every"
+            " follow_interval seconds, and sync the newly completed jobs as soon as"
+            " they are listed. The interval doubles while no new job is listed, up"
+            " to follow_max_interval. The streams after the jobs stream are synced"
+            " once follow mode stops.",
+        ),
+        th.Property(
+            "follow_max_interval",
+            th.NumberType,
+            required=False,
+            description="Longest wait between two listings of the export jobs in"
+            " follow mode, in seconds, defaults to 16 times follow_interval.",
+        ),
+        th.Property(
+            "follow_timeout",
+            th.NumberType,
+            required=False,
+            description="Time after which follow mode stops, in seconds. Follow"
+            " mode runs until interrupted if not set.",
+        ),
+        th.Property(
+            "offload_dir",
+            th.StringType,
+            required=False,
+            description="Directory where the contents of conversation items larger"
+            " than offload_threshold_bytes are written, as gzip compressed JSON"
+            " files named by their SHA-256. The record then only keeps the content"
+            " type, and a content_ref property with the file URI, hash and size.",
+        ),
+        th.Property(
+            "offload_threshold_bytes",
+            th.IntegerType,
+            required=False,
+            description="Size of the JSON of the conversation item contents"
+            " written to offload_dir, defaults to 1048576 (1 MiB).",
+        ),
+        th.Property(
+            "profile_dir",
+            th.StringType,
+            required=False,
+            description="Directory where the sync is profiled: cProfile statistics"
+            " of each stream (<stream>.pstats), collapsed stacks sampled every 5 ms"
+            " of CPU time weighted by time (cpu.collapsed) and by allocated bytes"
+            " (alloc.collapsed) for flame graphs, and the time and allocations of"
+            " each stage of each stream (stages.json). Slows the sync down. Can be"
+            " set for a single run with the TAP_GLADLY_PROFILE_DIR environment"
+            " variable and --config=ENV.",
+        ),
+        th.Property(
+            "accounts",
+            th.ArrayType(
+                th.ObjectType(
+                    th.Property("name", th.StringType, required=True),
+                    th.Property("api_url_base", th.StringType),
+                    th.Property("username", th.StringType),
+                    th.Property("password", th.StringType),
+                )
+            ),
+            required=False,
+            description="Gladly accounts synced by the tap, each with a distinct"
+            " name and its own api_url_base, username and password, defaulting to"
+            " the top-level ones. Records are tagged with the name of their account"
+            " in an account property, and the state is kept per account. The"
+            " accounts are synced one after the other, the export files of all of"
+            " them are downloaded by the same max_parallel_jobs workers. Not"
+            " supported with follow_interval.",
+        ),
         th.Property(
             "api_url_base",
             th.StringType,
@@ -99,6 +302,175 @@ class Tapgladly(Tap):
         ),
     ).to_dict()
 
+    @property
+    def export_file_cache(self) -> Optional[ExportFileCache]:
+        """Return the export job files cache, or None if cache_dir is not set."""
+        if "cache_dir" not in self.config:
+            return None
+        if self._export_file_cache is None:
+            max_size_mb = self.config.get("cache_max_size_mb")
+            self._export_file_cache = ExportFileCache(
+                Path(self.config["cache_dir"]),
+                max_bytes=max_size_mb * 1024 * 1024 if max_size_mb else None,
+                max_age_days=self.config.get("max_job_lookback"),
+            )
+            self._export_file_cache.evict()
+        return self._export_file_cache
+
+    @property
+    def sync_window(self) -> TimeWindow:
+        """Return the window from start_date to end_date, parsed once."""
+        if self._sync_window is None:
+            self._sync_window = TimeWindow.parse(
+                self.config["start_date"], self.config.get("end_date")
+            )
+        return self._sync_window
+
+    @property
+    def lookback_window(self) -> Optional[TimeWindow]:
+        """Return the window of max_job_lookback, from the first time it is used."""
+        if "max_job_lookback" not in self.config:
+            return None
+        if self._lookback_window is None:
+            self._lookback_window = lookback_window(self.config["max_job_lookback"])
+        return self._lookback_window
+
+    @property
+    def batch_writer(self) -> Optional[BatchWriter]:
+        """Return the batch files writer, or None if batch_config is not set."""
+        if "batch_config" not in self.config:
+            return None
+        if self._batch_writer is None:
+            self._batch_writer = BatchWriter(
+                BatchConfig.from_config(self.config["batch_config"]),
+                write_state=self.write_state_message,
+            )
+        return self._batch_writer
+
+    @property
+    def dedup_index(self) -> Optional[DedupIndex]:
+        """Return the index of the emitted primary keys, or None if not enabled."""
+        if "dedup_path" not in self.config:
+            return None
+        if self._dedup_index is None:
+            self._dedup_index = DedupIndex(
+                Path(self.config["dedup_path"]),
+                max_age_days=self.config.get("max_job_lookback"),
+            )
+        return self._dedup_index
+
+    @property
+    def payload_offloader(self) -> Optional[PayloadOffloader]:
+        """Return the writer of the offloaded contents, or None if not enabled."""
+        if "offload_dir" not in self.config:
+            return None
+        if self._payload_offloader is None:
+            self._payload_offloader = PayloadOffloader(
+                Path(self.config["offload_dir"]),
+                self.config.get(
+                    "offload_threshold_bytes", self.DEFAULT_OFFLOAD_THRESHOLD_BYTES
+                ),
+            )
+        return self._payload_offloader
+
+    @property
+    def profiler(self) -> Optional[Profiler]:
+        """Return the profiler of the stream syncs, or None if not enabled."""
+        if "profile_dir" not in self.config:
+            return None
+        if self._profiler is None:
+            self._profiler = Profiler(Path(self.config["profile_dir"]))
+        return self._profiler
+
+    @property
+    def shard(self) -> Optional[Shard]:
+        """Return the shard synced by the tap, or None if the sync is not split."""
+        if self._shard is None:
+            self._shard = Shard.from_config(self.config)
+        return self._shard
+
+    @property
+    def accounts(self) -> Optional[List[Account]]:
+        """Return the synced accounts, or None if accounts is not set."""
+        if "accounts" not in self.config:
+            return None
+        if self._accounts is None:
+            accounts = Account.from_config(self.config) or []
+            self._accounts = {account.name: account for account in accounts}
+        return list(self._accounts.values())
+
+    def account(self, context: Optional[dict]) -> Optional[Account]:
+        """Return the account of a context, or None if it has no account."""
+        if not context or "account" not in context or self.accounts is None:
+            return None
+        return cast(Dict[str, Account], self._accounts)[context["account"]]
+
+    def write_state_message(self) -> None:
+        """Write a STATE message of the tap state, then save the emitted keys."""
+        singer.write_message(StateMessage(value=self.state))
+        if self.dedup_index is not None:
+            self.dedup_index.commit()
+
+    @property
+    def metrics(self) -> MetricsRecorder:
+        """Return the performance metrics of the streams."""
+        if self._metrics is None:
+            self._metrics = MetricsRecorder()
+        return self._metrics
+
+    @property
+    def http_pool_size(self) -> int:
+        """Return the maximum number of connections kept open to the API."""
+        return self.config.get(
+            "http_pool_size",
+            max(
+                self.DEFAULT_HTTP_POOL_SIZE,
+                self.config.get("max_parallel_jobs", 1)
+                + self.config.get("max_parallel_reports", 1),
+            ),
+        )
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        """Return the request scheduler shared by the streams."""
+        if self._scheduler is None:
+            self._scheduler = RequestScheduler(
+                max_concurrency=self.config.get(
+                    "max_concurrent_requests", self.http_pool_size
+                ),
+                rate=self.config.get("max_requests_per_second"),
+            )
+        return self._scheduler
+
+    @property
+    def requests_session(self) -> requests.Session:
+        """Return the HTTP session shared by the streams.
+
+        Connections are kept alive and reused by all the streams, instead of
+        each stream opening its own.
+        """
+        if self._requests_session is None:
+            # A pool per API host, the accounts may be on different hosts
+            adapter = HTTPAdapter(
+                pool_connections=max(len(self.accounts or []), 1),
+                pool_maxsize=self.http_pool_size,
+            )
+            self._requests_session = requests.Session()
+            self._requests_session.mount("http://", adapter)
+            self._requests_session.mount("https://", adapter)
+            self._requests_session.headers["Accept-Encoding"] = "gzip"
+        return self._requests_session
+
+    def get_authenticator(self, stream: RESTStream) -> BasicAuthenticator:
+        """Return the authenticator shared by the streams."""
+        if self._authenticator is None:
+            self._authenticator = BasicAuthenticator.create_for_stream(
+                stream,
+                username=self.config["username"],
+                password=self.config["password"],
+            )
+        return self._authenticator
+
     def discover_streams(self) -> List[Stream]:
         """Return a list of discovered streams."""
         return [stream_class(tap=self) for stream_class in STREAM_TYPES]
@@ -0,0 +1,14 @@
+"""Catalogs of the tap with some of its streams selected."""
+from tap_gladly.tap import Tapgladly
+
+
+def selected_catalog(config: dict, *stream_names: str) -> dict:
+    """Return the tap catalog with only the `stream_names` streams selected."""
+    catalog = Tapgladly(config=config, parse_env_config=False).catalog_dict
+    for stream in catalog["streams"]:
+        for metadata in stream["metadata"]:
+            if metadata["breadcrumb"] == []:
+                metadata["metadata"]["selected"] = (
+                    stream["tap_stream_id"] in stream_names
+                )
+    return catalog
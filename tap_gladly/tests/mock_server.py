@@ -0,0 +1,215 @@
+"""Local stand-in for the Gladly API, serving synthetic export files."""
+import json
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pendulum
+
+from tap_gladly.tests.synthetic import (
+    write_conversation_items,
+    write_report,
+    write_topics,
+)
+
+JOB_FILE_PATH = re.compile(r"^/export/jobs/(?P<job_id>[^/]+)/files/(?P<name>[^/?]+)$")
+
+
+class MockGladlyServer:
+    """HTTP server serving export jobs, job files and reports on localhost.
+
+    Every job serves the same generated files, of `conversation_items_mb`
+    megabytes of items in the `content_type_mix` proportions and `topics`
+    topics. Job files support range requests, like the Gladly API. If
+    `jobs_page_size` is set, the job list is paginated with Link headers.
+    Jobs completed while the server runs are added with `complete_job`.
+    """
+
+    def __init__(
+        self,
+        jobs: int = 1,
+        conversation_items_mb: float = 1,
+        topics: int = 100,
+        report_rows: int = 1000,
+        content_type_mix: Optional[Dict[str, float]] = None,
+        jobs_page_size: Optional[int] = None,
+    ) -> None:
+        """Set the size of the generated files, created once the server starts."""
+        self.jobs = jobs
+        self.conversation_items_mb = conversation_items_mb
+        self.topics = topics
+        self.report_rows = report_rows
+        self.content_type_mix = content_type_mix
+        self.jobs_page_size = jobs_page_size
+        self.conversation_items_rows = 0
+        self.started_at = pendulum.now("UTC")
+        self.completed_jobs: list = []
+        self.requests: list = []
+        self.authorizations: set = set()
+        self._directory: Optional[tempfile.TemporaryDirectory] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the API."""
+        assert self._server is not None, "The server is not started"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def files_dir(self) -> Path:
+        """Return the directory of the generated files."""
+        assert self._directory is not None, "The server is not started"
+        return Path(self._directory.name)
+
+    def __enter__(self) -> "MockGladlyServer":
+        """Generate the files and start serving them."""
+        self._directory = tempfile.TemporaryDirectory(prefix="tap-gladly-mock-")
+        with open(self.files_dir / "conversation_items.jsonl", "wb") as items:
+            self.conversation_items_rows = write_conversation_items(
+                items,
+                int(self.conversation_items_mb * 1024 * 1024),
+                self.content_type_mix,
+            )
+        with open(self.files_dir / "topics.jsonl", "wb") as topics:
+            write_topics(topics, self.topics)
+        with open(self.files_dir / "report.csv", "wb") as report:
+            write_report(report, self.report_rows)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        setattr(self._server, "gladly", self)
+        threading.Thread(
+            target=self._server.serve_forever, name="mock-gladly", daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Stop the server and remove the files."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._directory is not None:
+            self._directory.cleanup()
+            self._directory = None
+
+    def export_jobs(self) -> list:
+        """Return the completed export jobs, the latest first."""
+        jobs = [
+            self.export_job(f"job-{index}", self.started_at.subtract(hours=index))
+            for index in range(self.jobs)
+        ]
+        return self.completed_jobs[::-1] + jobs
+
+    def complete_job(self) -> dict:
+        """Add a job completed now, listed before the other jobs."""
+        job = self.export_job(
+            f"job-{self.jobs + len(self.completed_jobs)}", pendulum.now("UTC")
+        )
+        self.completed_jobs.append(job)
+        return job
+
+    def export_job(self, job_id: str, updated_at: pendulum.DateTime) -> dict:
+        """Return a completed export job of the day before `updated_at`."""
+        return {
+            "id": job_id,
+            "status": "COMPLETED",
+            "updatedAt": updated_at.isoformat(),
+            "parameters": {
+                "type": "CONVERSATIONS",
+                "startAt": updated_at.subtract(days=1).isoformat(),
+                "endAt": updated_at.isoformat(),
+            },
+            "files": ["conversation_items.jsonl", "topics.jsonl"],
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def gladly(self) -> MockGladlyServer:
+        return getattr(self.server, "gladly")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.gladly.requests.append(("GET", self.path))
+        self.gladly.authorizations.add(self.headers.get("Authorization"))
+        if self.path.split("?")[0] == "/export/jobs":
+            self._send_jobs()
+            return
+        match = JOB_FILE_PATH.match(self.path)
+        if match is None:
+            self._send(404, b"")
+            return
+        path = self.gladly.files_dir / match.group("name")
+        if not path.is_file():
+            self._send(404, b"")
+            return
+        self._send_file(path)
+
+    def do_POST(self) -> None:
+        self.gladly.requests.append(("POST", self.path))
+        self.gladly.authorizations.add(self.headers.get("Authorization"))
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/reports":
+            self._send(404, b"")
+            return
+        self._send_file(self.gladly.files_dir / "report.csv", "text/csv")
+
+    def _send_jobs(self) -> None:
+        jobs = self.gladly.export_jobs()
+        page_size = self.gladly.jobs_page_size
+        headers = {}
+        if page_size:
+            query = parse_qs(urlparse(self.path).query)
+            page = int(query.get("page", ["0"])[0])
+            if (page + 1) * page_size < len(jobs):
+                next_url = (
+                    f"{self.gladly.url}/export/jobs?status=COMPLETED&page={page + 1}"
+                )
+                headers["Link"] = f'<{next_url}>; rel="next"'
+            start = page * page_size
+            jobs = jobs[start:][:page_size]
+        self._send(200, json.dumps(jobs).encode(), headers)
+
+    def _send_file(self, path: Path, content_type: str = "application/x-ndjson"):
+        size = path.stat().st_size
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header:
+            start = int(range_header.split("=")[1].split("-")[0])
+            if start >= size:
+                self._send(416, b"")
+                return
+        self.send_response(206 if range_header else 200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(size - start))
+        if range_header:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.end_headers()
+        with open(path, "rb") as body:
+            body.seek(start)
+            while True:
+                chunk = body.read(1024 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def _send(
+        self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
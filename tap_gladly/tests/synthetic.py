@@ -0,0 +1,128 @@
+"""Synthetic Gladly export files for tests and benchmarks."""
+import csv
+import io
+import json
+import random
+from typing import IO, Dict, Optional
+
+# Rough share of each content type in a conversation_items.jsonl export
+CONTENT_TYPE_MIX: Dict[str, float] = {
+    "CHAT_MESSAGE": 0.35,
+    "EMAIL": 0.15,
+    "CONVERSATION_STATUS_CHANGE": 0.15,
+    "TOPIC_CHANGE": 0.1,
+    "CONVERSATION_NOTE": 0.06,
+    "PHONE_CALL": 0.05,
+    "SMS": 0.04,
+    "CUSTOMER_ACTIVITY": 0.03,
+    "VOICEMAIL": 0.02,
+    "FACEBOOK_MESSAGE": 0.02,
+    "INSTAGRAM_DIRECT": 0.01,
+    "TWITTER": 0.01,
+    "WHATSAPP": 0.01,
+}
+
+
+def conversation_item(index: int, content_type: str, body_size: int = 200) -> dict:
+    """Return a conversation item of the given content type."""
+    content: dict = {"type": content_type}
+    if content_type == "EMAIL":
+        content.update(
+            {
+                "from": "customer@example.com",
+                "to": ["support@example.com"],
+                "subject": f"Order {index}",
+                "content": "x" * body_size * 10,
+            }
+        )
+    elif content_type == "PHONE_CALL":
+        content.update(
+            {"startedAt": "2022-09-15T10:00:00.000Z", "recordingDuration": 120}
+        )
+    else:
+        content["content"] = "x" * body_size
+    return {
+        "id": f"item-{index}",
+        "conversationId": f"conversation-{index // 10}",
+        "customerId": f"customer-{index // 100}",
+        "timestamp": "2022-09-15T10:00:00.000Z",
+        "initiator": {"type": "CUSTOMER", "id": f"customer-{index // 100}"},
+        "content": content,
+    }
+
+
+def write_conversation_items(
+    output: IO[bytes],
+    size: int,
+    mix: Optional[Dict[str, float]] = None,
+    seed: int = 0,
+) -> int:
+    """Write about `size` bytes of conversation items, return the row count."""
+    mix = mix or CONTENT_TYPE_MIX
+    content_types = list(mix)
+    weights = list(mix.values())
+    rng = random.Random(seed)
+    written = 0
+    rows = 0
+    while written < size:
+        content_type = rng.choices(content_types, weights)[0]
+        line = json.dumps(conversation_item(rows, content_type)).encode() + b"\n"
+        output.write(line)
+        written += len(line)
+        rows += 1
+    return rows
+
+
+def write_topics(output: IO[bytes], rows: int) -> None:
+    """Write `rows` topics."""
+    for index in range(rows):
+        topic = {"id": f"topic-{index}", "name": f"Topic {index}", "disabled": False}
+        output.write(json.dumps(topic).encode() + b"\n")
+
+
+# Columns of the conversation timestamps report CSV
+REPORT_COLUMNS = [
+    "Timezone Filter",
+    "Timestamp",
+    "Event Type",
+    "Conversation ID",
+    "Customer ID",
+    "Initiator Type",
+    "Initiator ID",
+    "Initiator Agent Name",
+    "Assigned Inbox ID",
+    "Assigned Inbox Name",
+    "Assigned Agent ID",
+    "Assigned Agent Name",
+    "Topic ID",
+    "Topic Name",
+    "Newly Assigned Inbox ID",
+    "Newly Assigned Inbox Name",
+    "Newly Assigned Agent ID",
+    "Newly Assigned Agent Name",
+    "Assignment Update Reason",
+    "Merged Customer ID",
+    "Merged Conversation ID",
+]
+
+
+def write_report(output: IO[bytes], rows: int) -> None:
+    """Write a conversation timestamps report CSV of `rows` rows."""
+    text = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(REPORT_COLUMNS)
+    for index in range(rows):
+        row = {column: "" for column in REPORT_COLUMNS}
+        row.update(
+            {
+                "Timezone Filter": "UTC",
+                "Timestamp": "2022-09-15T10:00:00.000Z",
+                "Event Type": "CONVERSATION_CREATED",
+                "Conversation ID": f"conversation-{index}",
+                "Customer ID": f"customer-{index // 10}",
+                "Initiator Type": "CUSTOMER",
+            }
+        )
+        writer.writerow(row.values())
+    text.flush()
+    text.detach()
@@ -5,9 +5,11 @@ import pendulum
 from singer_sdk.testing import get_standard_tap_tests
 
 from tap_gladly.tap import Tapgladly
+from tap_gladly.tests.mock_server import MockGladlyServer
 
 SAMPLE_CONFIG = {
-    "start_date": pendulum.now().isoformat(),
+    # The report is requested for the days which are over
+    "start_date": pendulum.now().subtract(days=1).isoformat(),
     "username": "test",
     "password": "test",
     "api_url_base": "api_base_url",
@@ -17,8 +19,10 @@ SAMPLE_CONFIG = {
 # Run standard built-in tap tests from the SDK:
 def test_standard_tap_tests():
     """Run standard tap tests from the SDK."""
-    tests = get_standard_tap_tests(Tapgladly, config=SAMPLE_CONFIG)
-    #  TODO(Youssef): This is hacky, ideally we would mock the rest api connection
-    tests.pop(2)
-    for test in tests:
-        test()
+    with MockGladlyServer(conversation_items_mb=0.1) as server:
+        tests = get_standard_tap_tests(
+            Tapgladly, config=dict(SAMPLE_CONFIG, api_url_base=server.url)
+        )
+        for test in tests:
+            test()
+        assert ("POST", "/reports") in server.requests
@@ -1,16 +1,54 @@
 """Tests standard tap features using the built-in SDK tests library."""
 
+import base64
+import copy
 import datetime
+import functools
+import gzip
+import hashlib
+import io
+import json
+import os
+import pstats
+import signal
+import threading
+import time
 from unittest import mock
 
 import pendulum
+import pytest
+import requests
+from singer_sdk.exceptions import FatalAPIError
+from singer_sdk.helpers._catalog import pop_deselected_record_properties
+from singer_sdk.helpers._typing import conform_record_data_types
 
+from tap_gladly.batch import BatchConfig, ParquetBatchFile
+from tap_gladly.cache import ExportFileCache
+from tap_gladly.csv_reports import iter_csv_records
+from tap_gladly.dedup import DedupIndex
+from tap_gladly.jsonl import decode_records, iter_jsonl_records, peek_content_type
+from tap_gladly.metrics import MetricsRecorder, StreamMetrics
+from tap_gladly.prefetch import Prefetcher
+from tap_gladly.scheduler import HIGH_PRIORITY, LOW_PRIORITY, RequestScheduler
+from tap_gladly.sharding import merge_states
 from tap_gladly.streams import (
+    ConversationItemsFanOut,
     ExportCompletedJobsStream,
+    ExportFileConversationItemsAllTypesStream,
     ExportFileConversationItemsChatMessage,
+    ExportFileConversationItemsEmail,
+    ExportFileConversationItemsSms,
+    ExportFileConversationItemsStream,
     ExportFileTopicsStream,
+    ReportsConversationTimestampsReportStream,
+    conversation_content_types,
+    conversation_items_stream_type,
 )
 from tap_gladly.tap import Tapgladly
+from tap_gladly.tests.catalog import selected_catalog
+from tap_gladly.tests.mock_server import MockGladlyServer
+from tap_gladly.tests.synthetic import conversation_item
+from tap_gladly.timewindow import DAY, TimeWindow, lookback_window, to_epoch
 
 SAMPLE_CONFIG = {
     "start_date": pendulum.now(),
@@ -121,3 +159,1214 @@ def test_max_job_lookback_get_records(mocked_super_get_records):
     assert len(file_stream.get_records(valid_job_context)) > 0
     assert len(file_stream.get_records(earliest_valid_job_context)) > 0
     assert len(file_stream.get_records(ignored_job_context)) == 0
+
+
+@mock.patch("tap_gladly.streams.ExportFileConversationItemsStream.download_lines")
+def test_conversation_items_fan_out(mocked_download_lines):
+    tap_gladly = Tapgladly(
+        config=dict(SAMPLE_CONFIG, start_date=pendulum.now().isoformat()),
+        parse_env_config=False,
+    )
+    chat_stream = ExportFileConversationItemsChatMessage(tap_gladly)
+    email_stream = ExportFileConversationItemsEmail(tap_gladly)
+    all_types_stream = ExportFileConversationItemsAllTypesStream(tap_gladly)
+    mocked_download_lines.return_value = [
+        b'{"id": "1", "content": {"type": "CHAT_MESSAGE", "content": "hi"}}',
+        b'{"id": "2", "content": {"type": "EMAIL", "body": "hello"}}',
+        b'{"id": "3", "content": {"type": "SMS", "content": "hey"}}',
+    ]
+    written = []
+    context = {"job_id": "job_id", "updatedAt": pendulum.now().isoformat()}
+
+    with mock.patch.object(
+        ExportFileConversationItemsStream,
+        "_write_record_message",
+        autospec=True,
+        side_effect=lambda stream, record: written.append((stream.name, record)),
+    ):
+        ConversationItemsFanOut([chat_stream, email_stream, all_types_stream]).sync(
+            context
+        )
+
+    assert mocked_download_lines.call_count == 1
+    assert written == [
+        ("conversation_all_types", {"id": "1", "content": {"type": "CHAT_MESSAGE"}}),
+        (
+            "conversation_chat_message",
+            {"id": "1", "content": {"type": "CHAT_MESSAGE", "content": "hi"}},
+        ),
+        ("conversation_all_types", {"id": "2", "content": {"type": "EMAIL"}}),
+        (
+            "conversation_email",
+            {"id": "2", "content": {"type": "EMAIL", "body": "hello"}},
+        ),
+        ("conversation_all_types", {"id": "3", "content": {"type": "SMS"}}),
+    ]
+    # The file is parsed once for all the streams
+    metrics = tap_gladly.metrics.summary()["streams"]
+    assert metrics["conversation_items"]["total"]["parsed_lines"] == 3
+    assert metrics["conversation_chat_message"]["total"]["parsed_lines"] == 0
+    assert metrics["conversation_chat_message"]["total"]["emitted_rows"] == 1
+
+
+def test_jobs_bookmark():
+    bookmark = (pendulum.now() - datetime.timedelta(days=1)).isoformat()
+    tap_gladly = Tapgladly(
+        config=dict(
+            SAMPLE_CONFIG,
+            start_date=(pendulum.now() - datetime.timedelta(days=5)).isoformat(),
+        ),
+        state={
+            "bookmarks": {
+                "jobs": {
+                    "replication_key": "updatedAt",
+                    "replication_key_value": bookmark,
+                }
+            }
+        },
+        parse_env_config=False,
+    )
+    export_jobs_stream = tap_gladly.streams["jobs"]
+    export_jobs_stream._write_starting_replication_value(None)
+    before_row = {
+        "record": "data",
+        "updatedAt": (pendulum.now() - datetime.timedelta(days=2)).isoformat(),
+    }
+    after_row = {"record": "data", "updatedAt": pendulum.now().isoformat()}
+    assert not export_jobs_stream.post_process(before_row, None)
+    assert export_jobs_stream.post_process(after_row, None)
+
+
+def test_jobs_bookmark_without_jobs_selected(capsys):
+    with MockGladlyServer(jobs=3, conversation_items_mb=0.01, topics=5) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+        )
+        catalog = selected_catalog(config, "topics")
+        Tapgladly(config=config, catalog=catalog, parse_env_config=False).sync_all()
+        latest_job = server.export_jobs()[0]
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert not [m for m in messages if m.get("stream") == "jobs"]
+    state = [m for m in messages if m["type"] == "STATE"][-1]["value"]
+    jobs_state = state["bookmarks"]["jobs"]
+    assert jobs_state["replication_key_value"] == latest_job["updatedAt"]
+    assert "progress_markers" not in jobs_state
+
+
+@mock.patch("tap_gladly.streams.ExportFileTopicsStream.sync")
+def test_synced_jobs_are_skipped(mocked_sync):
+    tap_gladly = Tapgladly(
+        config=dict(SAMPLE_CONFIG, start_date=pendulum.now().isoformat()),
+        parse_env_config=False,
+    )
+    export_jobs_stream = tap_gladly.streams["jobs"]
+    export_jobs_stream.child_streams = [tap_gladly.streams["topics"]]
+    context = {"job_id": "job_id", "updatedAt": pendulum.now().isoformat()}
+
+    export_jobs_stream._sync_children(context)
+    export_jobs_stream._sync_children(context)
+    export_jobs_stream._sync_children(dict(context, job_id="job_id_2"))
+
+    assert mocked_sync.call_count == 2
+    assert tap_gladly.streams["topics"].is_job_synced(context)
+
+
+@mock.patch("tap_gladly.streams.ExportFileTopicsStream.sync")
+def test_known_jobs_are_filtered(mocked_sync):
+    tap_gladly = Tapgladly(
+        config=dict(SAMPLE_CONFIG, start_date=pendulum.now().isoformat()),
+        parse_env_config=False,
+    )
+    export_jobs_stream = tap_gladly.streams["jobs"]
+    export_jobs_stream.child_streams = [tap_gladly.streams["topics"]]
+    job = {"id": "job_id", "updatedAt": pendulum.now().add(hours=1).isoformat()}
+    assert export_jobs_stream.post_process(job, None)
+
+    export_jobs_stream._sync_children(export_jobs_stream.get_child_context(job, None))
+
+    assert not export_jobs_stream.post_process(job, None)
+    assert export_jobs_stream.post_process(
+        dict(job, updatedAt=pendulum.now().add(hours=2).isoformat()), None
+    )
+    # The index is reset when streams which did not sync the jobs are selected
+    tap_gladly = Tapgladly(
+        config=dict(SAMPLE_CONFIG, start_date=pendulum.now().isoformat()),
+        state=export_jobs_stream.tap_state,
+        parse_env_config=False,
+    )
+    assert tap_gladly.streams["jobs"].post_process(job, None)
+
+
+def test_jobs_listing_stops_at_start_date():
+    with MockGladlyServer(jobs=6, jobs_page_size=2) as server:
+        tap_gladly = Tapgladly(
+            config=dict(
+                SAMPLE_CONFIG,
+                start_date=pendulum.now().subtract(minutes=150).isoformat(),
+                api_url_base=server.url,
+            ),
+            parse_env_config=False,
+        )
+        jobs = list(tap_gladly.streams["jobs"].get_records(None))
+
+    assert [job["id"] for job in jobs] == ["job-0", "job-1", "job-2"]
+    assert server.requests == [
+        ("GET", "/export/jobs?status=COMPLETED"),
+        ("GET", "/export/jobs?status=COMPLETED&page=1"),
+    ]
+
+
+def test_jobs_listing_stops_at_bookmark_without_jobs_selected(capsys):
+    with MockGladlyServer(
+        jobs=6, conversation_items_mb=0.01, topics=5, jobs_page_size=2
+    ) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+        )
+        catalog = selected_catalog(config, "topics")
+        Tapgladly(config=config, catalog=catalog, parse_env_config=False).sync_all()
+        messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        state = [m for m in messages if m["type"] == "STATE"][-1]["value"]
+        assert len(state["bookmarks"]["jobs"]["known_jobs"]["jobs"]) == 6
+
+        server.requests.clear()
+        Tapgladly(
+            config=config, catalog=catalog, state=state, parse_env_config=False
+        ).sync_all()
+        messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    # The first page lists jobs older than the bookmark, the next ones are not read
+    assert server.requests == [("GET", "/export/jobs?status=COMPLETED")]
+    assert not [m for m in messages if m["type"] == "RECORD"]
+    state = [m for m in messages if m["type"] == "STATE"][-1]["value"]
+    assert list(state["bookmarks"]["jobs"]["known_jobs"]["jobs"]) == ["job-0"]
+    assert [
+        partition["context"]["job_id"]
+        for partition in state["bookmarks"]["topics"]["partitions"]
+    ] == ["job-0"]
+
+
+def test_prefetcher_replays_records_in_order():
+    def failing_records():
+        yield {"id": "1"}
+        raise RuntimeError("connection lost")
+
+    with Prefetcher(max_workers=2, queue_size=2, chunk_size=3) as prefetcher:
+        prefetcher.submit("job_1", lambda: ({"id": str(i)} for i in range(50)))
+        prefetcher.submit("job_2", failing_records)
+
+        assert prefetcher.pop("unknown") is None
+        assert [record["id"] for record in prefetcher.pop("job_1")] == [
+            str(i) for i in range(50)
+        ]
+        with pytest.raises(RuntimeError):
+            list(prefetcher.pop("job_2"))
+
+
+def test_prefetched_files_of_filtered_jobs_are_cancelled(capsys):
+    with MockGladlyServer(jobs=3, conversation_items_mb=0.01, topics=5) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+            max_parallel_jobs=2,
+            stream_maps={"jobs": {"__filter__": "id == 'job-2'"}},
+        )
+        catalog = selected_catalog(config, "jobs", "topics")
+        tap = Tapgladly(config=config, catalog=catalog, parse_env_config=False)
+        # The files of the filtered jobs fill their queues and block both workers
+        # until cancelled, job-2 files would never be downloaded otherwise
+        small_prefetcher = functools.partial(Prefetcher, queue_size=1, chunk_size=1)
+        with mock.patch("tap_gladly.streams.Prefetcher", small_prefetcher):
+            sync = threading.Thread(target=tap.sync_all, daemon=True)
+            sync.start()
+            sync.join(timeout=30)
+        assert not sync.is_alive()
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [message for message in messages if message["type"] == "RECORD"]
+    assert [r["record"]["id"] for r in records if r["stream"] == "jobs"] == ["job-2"]
+    assert len([r for r in records if r["stream"] == "topics"]) == 5
+
+
+def test_iter_jsonl_records():
+    lines = [b'{"id": "1"}', b"", b'[{"id": "2"}, {"id": "3"}]']
+    assert [record["id"] for record in iter_jsonl_records(lines)] == ["1", "2", "3"]
+
+    lines = [b'{"data": [{"id": "4"}]}']
+    assert list(iter_jsonl_records(lines, "$.data[*]")) == [{"id": "4"}]
+
+
+def test_peek_content_type():
+    assert peek_content_type(b'{"content": {"type": "EMAIL", "to": ["a"]}}') == b"EMAIL"
+    assert (
+        peek_content_type(b'{"content":{"content":"\\"type\\": x","type":"SMS"}}')
+        == b"SMS"
+    )
+    # A content nested in another property is not the conversation item content
+    assert (
+        peek_content_type(
+            b'{"initiator": {"type": "AGENT"}, "content": {"type": "SMS"}}'
+        )
+        == b"SMS"
+    )
+    assert (
+        peek_content_type(
+            b'{"customer": {"content": {"type": "EMAIL"}}, "content": {"type": "SMS"}}'
+        )
+        is None
+    )
+    assert peek_content_type(b'{"items": [{"content": {"type": "EMAIL"}}]}') is None
+    # Undecidable without decoding the line
+    assert peek_content_type(b'{"content": {"body": {"type": "x"}}}') is None
+
+
+@mock.patch("tap_gladly.streams.decode_records", side_effect=decode_records)
+@mock.patch("tap_gladly.streams.ExportFileConversationItemsStream.download_lines")
+def test_conversation_items_fan_out_prefilter(
+    mocked_download_lines, mocked_decode_records
+):
+    tap_gladly = Tapgladly(
+        config=dict(SAMPLE_CONFIG, start_date=pendulum.now().isoformat()),
+        parse_env_config=False,
+    )
+    chat_stream = ExportFileConversationItemsChatMessage(tap_gladly)
+    mocked_download_lines.return_value = [
+        b'{"id": "1", "content": {"type": "CHAT_MESSAGE"}}',
+        b'{"id": "2", "content": {"type": "EMAIL"}}',
+        b'{"id": "3", "content": {"attachment": {}, "type": "EMAIL"}}',
+    ]
+    written = []
+    context = {"job_id": "job_id", "updatedAt": pendulum.now().isoformat()}
+
+    with mock.patch.object(
+        ExportFileConversationItemsStream,
+        "_write_record_message",
+        autospec=True,
+        side_effect=lambda stream, record: written.append(record["id"]),
+    ):
+        ConversationItemsFanOut([chat_stream]).sync(context)
+
+    assert written == ["1"]
+    # The EMAIL line without nested object is skipped without being decoded
+    assert mocked_decode_records.call_count == 2
+    assert chat_stream.get_checkpoint(context).line == 3
+
+
+def test_export_file_cache(tmp_path):
+    cache = ExportFileCache(tmp_path, max_bytes=20)
+    assert cache.read_lines("job_id", "topics.jsonl") is None
+
+    lines = cache.write_lines("job_id", "topics.jsonl", iter([b'{"id": "1"}']))
+    assert list(lines) == [b'{"id": "1"}']
+    assert list(cache.read_lines("job_id", "topics.jsonl")) == [b'{"id": "1"}']
+
+    # Interrupted downloads are not cached
+    lines = cache.write_lines("job_id_2", "topics.jsonl", iter([b"{}", b"{}"]))
+    next(lines)
+    lines.close()
+    assert cache.read_lines("job_id_2", "topics.jsonl") is None
+
+    # Oldest files are evicted first once the cache is full
+    os.utime(cache.path("job_id", "topics.jsonl"), (0, 0))
+    list(cache.write_lines("job_id_3", "topics.jsonl", iter([b'{"id": "3"}'])))
+    assert cache.read_lines("job_id", "topics.jsonl") is None
+    assert cache.read_lines("job_id_3", "topics.jsonl") is not None
+
+
+def test_export_file_cache_evicts_files_of_old_jobs(tmp_path):
+    cache = ExportFileCache(tmp_path, max_age_days=2)
+    now = to_epoch(pendulum.now())
+    # An old job downloaded now is evicted, a recent job downloaded long ago is not
+    list(cache.write_lines("old_job", "topics.jsonl", [b"{}"], now - 4 * DAY))
+    list(cache.write_lines("recent_job", "topics.jsonl", [b"{}"], now - DAY))
+    os.utime(cache.path("recent_job", "topics.jsonl"), (0, 0))
+    cache.evict()
+    assert cache.read_lines("old_job", "topics.jsonl") is None
+    assert not cache.metadata_path(cache.path("old_job", "topics.jsonl")).exists()
+    assert cache.read_lines("recent_job", "topics.jsonl") is not None
+
+
+def test_download_resumes_after_connection_error():
+    tap_gladly = Tapgladly(
+        config=dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().isoformat(),
+            api_url_base="https://example.gladly.com",
+        ),
+        parse_env_config=False,
+    )
+    file_stream = ExportFileTopicsStream(tap_gladly)
+    file_stream.DOWNLOAD_CHUNK_SIZE = 4
+    content = b'{"id": "1"}\n{"id": "2"}\n{"id": "3"}\n'
+
+    def send(prepared_request, context):
+        range_header = prepared_request.headers.get("Range")
+        response = mock.Mock(status_code=206 if range_header else 200)
+        if range_header is None:
+
+            def interrupted(chunk_size):
+                yield content[:4]
+                yield content[4:14]
+                raise requests.exceptions.ChunkedEncodingError()
+
+            response.iter_content.side_effect = interrupted
+        else:
+            assert prepared_request.headers["Accept-Encoding"] == "identity"
+            offset = int(range_header.split("=")[1].rstrip("-"))
+            response.iter_content.return_value = [content[offset:]]
+        return response
+
+    context = {"job_id": "job_id", "updatedAt": pendulum.now().isoformat()}
+    with mock.patch.object(ExportFileTopicsStream, "_request", side_effect=send):
+        records = list(file_stream.request_records(context))
+
+    assert records == [{"id": "1"}, {"id": "2"}, {"id": "3"}]
+    assert file_stream.get_checkpoint(context) == (3, len(content))
+
+
+@mock.patch("tap_gladly.streams.ExportFileConversationItemsStream.download_lines")
+def test_conversation_items_fan_out_resumes_from_checkpoint(mocked_download_lines):
+    tap_gladly = Tapgladly(
+        config=dict(SAMPLE_CONFIG, start_date=pendulum.now().isoformat()),
+        parse_env_config=False,
+    )
+    chat_stream = ExportFileConversationItemsChatMessage(tap_gladly)
+    all_types_stream = ExportFileConversationItemsAllTypesStream(tap_gladly)
+    lines = [
+        b'{"id": "1", "content": {"type": "CHAT_MESSAGE"}}',
+        b'{"id": "2", "content": {"type": "CHAT_MESSAGE"}}',
+        b'{"id": "3", "content": {"type": "CHAT_MESSAGE"}}',
+    ]
+    context = {"job_id": "job_id", "updatedAt": pendulum.now().isoformat()}
+    chat_stream.get_context_state(context)["checkpoint"] = {
+        "line": 2,
+        "offset": len(lines[0]) + len(lines[1]) + 2,
+    }
+    all_types_stream.get_context_state(context)["checkpoint"] = {
+        "line": 1,
+        "offset": len(lines[0]) + 1,
+    }
+    mocked_download_lines.return_value = lines[1:]
+    written = []
+
+    with mock.patch.object(
+        ExportFileConversationItemsStream,
+        "_write_record_message",
+        autospec=True,
+        side_effect=lambda stream, record: written.append((stream.name, record["id"])),
+    ):
+        ConversationItemsFanOut([chat_stream, all_types_stream]).sync(context)
+
+    mocked_download_lines.assert_called_once_with(context, len(lines[0]) + 1)
+    assert written == [
+        ("conversation_all_types", "2"),
+        ("conversation_all_types", "3"),
+        ("conversation_chat_message", "3"),
+    ]
+    assert chat_stream.get_checkpoint(context).line == 3
+    assert all_types_stream.get_checkpoint(context).line == 3
+
+
+def test_report_windows():
+    tap_gladly = Tapgladly(
+        config=dict(
+            SAMPLE_CONFIG,
+            start_date="2022-01-01",
+            end_date="2022-01-20",
+            report_window_days=7,
+        ),
+        parse_env_config=False,
+    )
+    report_stream = ReportsConversationTimestampsReportStream(tap_gladly)
+
+    assert report_stream.partitions == [
+        {"startAt": "2022-01-01", "endAt": "2022-01-08"},
+        {"startAt": "2022-01-08", "endAt": "2022-01-15"},
+        {"startAt": "2022-01-15", "endAt": "2022-01-20"},
+    ]
+    assert report_stream.prepare_request_payload(report_stream.partitions[1], None) == {
+        "metricSet": "ConversationTimestampsReport",
+        "startAt": "2022-01-08",
+        "endAt": "2022-01-15",
+        "timezone": "UTC",
+    }
+
+    report_stream.get_context_state(report_stream.partitions[0])["synced"] = True
+    with mock.patch(
+        "tap_gladly.streams.gladlyStream.request_records",
+        return_value=[{"Conversation ID": "1"}],
+    ) as mocked_request_records:
+        records = [
+            record
+            for window in report_stream.partitions
+            for record in report_stream.get_records(window)
+        ]
+
+    assert len(records) == 2
+    assert mocked_request_records.call_count == 2
+    # The synced windows are merged in the stream bookmark
+    assert report_stream.stream_state["syncedUntil"] == "2022-01-20"
+    assert report_stream.partitions == []
+
+
+def test_synced_report_windows_are_merged():
+    config = dict(SAMPLE_CONFIG, start_date="2022-01-01", end_date="2022-01-20")
+    tap_gladly = Tapgladly(config=config, parse_env_config=False)
+    report_stream = ReportsConversationTimestampsReportStream(tap_gladly)
+    first_window, second_window, last_window = report_stream.partitions
+
+    def sync_window(window):
+        with mock.patch(
+            "tap_gladly.streams.gladlyStream.request_records",
+            return_value=[{"Conversation ID": "1"}],
+        ):
+            list(report_stream.get_records(window))
+
+    # A window after a window left to sync is kept as a partition
+    sync_window(second_window)
+    assert "syncedUntil" not in report_stream.stream_state
+    assert report_stream.get_context_state(second_window)["synced"]
+
+    sync_window(first_window)
+    assert report_stream.stream_state["syncedUntil"] == "2022-01-15"
+    assert [
+        partition["context"] for partition in report_stream.stream_state["partitions"]
+    ] == [last_window]
+
+    # The next run only syncs the windows after the bookmark
+    tap_gladly = Tapgladly(
+        config=config, state=tap_gladly.state, parse_env_config=False
+    )
+    report_stream = ReportsConversationTimestampsReportStream(tap_gladly)
+    assert report_stream.partitions == [last_window]
+    assert report_stream.request_context(last_window) == last_window
+
+
+def test_report_days_are_requested_once():
+    today = pendulum.now("UTC").start_of("day")
+    tap_gladly = Tapgladly(
+        config=dict(
+            SAMPLE_CONFIG,
+            start_date=today.subtract(days=10).isoformat(),
+            report_window_days=7,
+        ),
+        parse_env_config=False,
+    )
+    report_stream = ReportsConversationTimestampsReportStream(tap_gladly)
+    # The last window ends in the future, only its days which are over are synced
+    last_window = report_stream.partitions[-1]
+    assert last_window == {
+        "startAt": today.subtract(days=3).to_date_string(),
+        "endAt": today.add(days=4).to_date_string(),
+    }
+
+    def sync_last_window():
+        with mock.patch(
+            "tap_gladly.streams.gladlyStream.request_records",
+            return_value=[{"Conversation ID": "1"}],
+        ) as mocked_request_records:
+            list(report_stream.get_records(last_window))
+        return [
+            report_stream.prepare_request_payload(call.args[0], None)
+            for call in mocked_request_records.call_args_list
+        ]
+
+    [payload] = sync_last_window()
+    assert (payload["startAt"], payload["endAt"]) == (
+        today.subtract(days=3).to_date_string(),
+        today.to_date_string(),
+    )
+    assert sync_last_window() == []
+
+    # The next day, only the day which is over since is requested
+    report_stream._end_day = None
+    with mock.patch(
+        "tap_gladly.streams.now_epoch", return_value=to_epoch(today.add(days=1))
+    ):
+        [payload] = sync_last_window()
+    assert (payload["startAt"], payload["endAt"]) == (
+        today.to_date_string(),
+        today.add(days=1).to_date_string(),
+    )
+    assert not report_stream.get_context_state(last_window).get("synced")
+
+
+def test_projection_matches_sdk_conformance():
+    tap_gladly = Tapgladly(
+        config=dict(SAMPLE_CONFIG, start_date=pendulum.now().isoformat()),
+        parse_env_config=False,
+    )
+    email_stream = ExportFileConversationItemsEmail(tap_gladly)
+    email_stream.metadata[
+        ("properties", "content", "properties", "content")
+    ].selected = False
+    email_stream.metadata[("properties", "responder")].selected = False
+    email_stream._mask = None
+    row = conversation_item(1, "EMAIL")
+    row["content"]["unknown"] = "kept"
+    row["responder"] = {"type": "AGENT", "id": "agent"}
+    row["unknown"] = "dropped"
+    original = copy.deepcopy(row)
+
+    projected = email_stream.project_record(row)
+
+    expected = copy.deepcopy(row)
+    pop_deselected_record_properties(
+        expected, email_stream.schema, email_stream.mask, email_stream.logger
+    )
+    expected = conform_record_data_types(
+        email_stream.name, expected, email_stream.schema, email_stream.logger
+    )
+    assert projected == expected
+    assert "content" not in projected["content"]
+    assert projected["content"]["unknown"] == "kept"
+    assert row == original
+
+
+def test_metrics_summary(tmp_path):
+    recorder = MetricsRecorder()
+    job_metrics = recorder.get("topics", "job_id")
+    assert list(job_metrics.iter_timed_chunks([b"ab", b"cde"])) == [b"ab", b"cde"]
+    job_metrics.parsed_lines += 2
+    job_metrics.parse_seconds += 0.5
+    recorder.get("topics", None).emitted_rows += 2
+    recorder.write_summary(tmp_path / "metrics.json")
+
+    with open(tmp_path / "metrics.json") as summary_file:
+        summary = json.load(summary_file)["streams"]["topics"]
+    assert summary["jobs"]["job_id"]["download_bytes"] == 5
+    assert summary["jobs"]["job_id"]["parsed_lines_per_second"] == 4.0
+    assert summary["total"]["emitted_rows"] == 2
+    assert summary["total"]["parsed_lines"] == 2
+    assert ("counter", "gladly_download_bytes", 5) in job_metrics.metrics()
+
+
+def test_iter_csv_records():
+    body = io.BytesIO(
+        b'Conversation ID,Note,Count,Missing\r\n1,"two\nlines",3,\r\n\r\n2,x\r\n'
+    )
+    schema = {
+        "properties": {
+            "Conversation ID": {"type": "string"},
+            "Note": {"type": "string"},
+            "Count": {"type": ["integer", "null"]},
+        }
+    }
+
+    metrics = StreamMetrics()
+
+    assert list(iter_csv_records(body, schema, metrics)) == [
+        {"Conversation ID": "1", "Note": "two\nlines", "Count": 3, "Missing": ""},
+        {"Conversation ID": "2", "Note": "x", "Count": None, "Missing": None},
+    ]
+    assert metrics.download_bytes == len(body.getvalue())
+
+
+def test_streams_share_session_and_authenticator():
+    tap_gladly = Tapgladly(
+        config=dict(
+            SAMPLE_CONFIG, start_date=pendulum.now().isoformat(), max_parallel_jobs=16
+        ),
+        parse_env_config=False,
+    )
+    topics_stream = ExportFileTopicsStream(tap_gladly)
+    email_stream = ExportFileConversationItemsEmail(tap_gladly)
+
+    assert topics_stream.requests_session is email_stream.requests_session
+    assert topics_stream.authenticator is email_stream.authenticator
+    adapter = topics_stream.requests_session.get_adapter("https://example.com")
+    assert adapter._pool_maxsize == 17
+    assert topics_stream.requests_session.headers["Accept-Encoding"] == "gzip"
+
+
+def test_throttled_request_waits_for_retry_after():
+    tap_gladly = Tapgladly(
+        config=dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().isoformat(),
+            api_url_base="https://example.gladly.com",
+        ),
+        parse_env_config=False,
+    )
+    stream = ExportCompletedJobsStream(tap_gladly)
+    throttled = requests.Response()
+    throttled.status_code = 429
+    throttled.headers["Retry-After"] = "0.2"
+    throttled.raw = io.BytesIO(b"")
+    accepted = requests.Response()
+    accepted.status_code = 200
+    sent_at = []
+
+    def send(*args, **kwargs):
+        sent_at.append(pendulum.now().float_timestamp)
+        return throttled if len(sent_at) == 1 else accepted
+
+    with mock.patch.object(tap_gladly.requests_session, "send", side_effect=send):
+        response = stream._request(
+            stream.prepare_request(None, next_page_token=None), None
+        )
+
+    assert response is accepted
+    assert sent_at[1] - sent_at[0] >= 0.2
+    # Halved by the throttled request, increased by the accepted one
+    assert tap_gladly.scheduler.concurrency == 5.2
+    assert stream.request_priority == HIGH_PRIORITY
+
+
+def test_failed_request_is_closed_and_tagged_with_its_url():
+    tap_gladly = Tapgladly(
+        config=dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().isoformat(),
+            api_url_base="https://example.gladly.com",
+        ),
+        parse_env_config=False,
+    )
+    stream = ExportCompletedJobsStream(tap_gladly)
+    stream._LOG_REQUEST_METRIC_URLS = True
+    failed = requests.Response()
+    failed.status_code = 404
+    failed.raw = io.BytesIO(b"")
+    failed.url = "https://example.gladly.com/export/jobs?status=COMPLETED"
+
+    with mock.patch.object(
+        tap_gladly.requests_session, "send", return_value=failed
+    ), mock.patch.object(failed, "close") as close, mock.patch.object(
+        stream, "_write_metric_log"
+    ) as write_metric_log:
+        with pytest.raises(FatalAPIError):
+            stream._request(stream.prepare_request(None, next_page_token=None), None)
+
+    close.assert_called_once()
+    metric = write_metric_log.call_args_list[0]
+    assert metric.kwargs["extra_tags"]["url"] == "/export/jobs?status=COMPLETED"
+
+
+def test_scheduler_sends_high_priority_requests_first():
+    scheduler = RequestScheduler(max_concurrency=1)
+    scheduler.acquire()
+    order = []
+
+    def send(priority, name):
+        with scheduler.request(priority):
+            order.append(name)
+
+    low = threading.Thread(target=send, args=(LOW_PRIORITY, "file"))
+    low.start()
+    time.sleep(0.1)
+    high = threading.Thread(target=send, args=(HIGH_PRIORITY, "jobs"))
+    high.start()
+    time.sleep(0.1)
+    scheduler.release()
+    low.join()
+    high.join()
+
+    assert order == ["jobs", "file"]
+
+
+@pytest.mark.parametrize(
+    "timestamp",
+    [
+        "2022-03-01T10:00:00Z",
+        "2022-03-01T10:00:00.123Z",
+        "2022-03-01T10:00:00.1234+02:00",
+        "2022-03-01",
+        "2022-03-01T10:00:00",
+        "20220301T100000Z",
+    ],
+)
+def test_to_epoch_matches_pendulum(timestamp):
+    parsed = pendulum.parse(timestamp)
+    assert to_epoch(timestamp) == round(parsed.timestamp() * 1_000_000)
+    assert to_epoch(parsed) == to_epoch(timestamp)
+
+
+def test_time_window():
+    window = TimeWindow.parse("2022-03-01T00:00:00Z", "2022-03-02T00:00:00+00:00")
+
+    assert "2022-03-01T00:00:00Z" in window
+    assert "2022-03-02T01:00:00+01:00" in window
+    assert "2022-03-02T00:00:00.001Z" not in window
+    assert window.is_before("2022-02-28T23:59:59Z")
+    assert "1999-01-01" in TimeWindow()
+    assert not TimeWindow().is_before("1999-01-01")
+    lookback = lookback_window(5, now=10 * DAY)
+    assert 4 * DAY + 1 in lookback
+    assert 4 * DAY not in lookback
+
+
+def test_batch_mode(tmp_path, capsys):
+    with MockGladlyServer(jobs=2, conversation_items_mb=0.2) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+            batch_config={
+                "encoding": {"format": "jsonl", "compression": "gzip"},
+                "storage": {"root": tmp_path.as_uri(), "prefix": "test-"},
+                "batch_size": 100,
+            },
+        )
+        catalog = selected_catalog(config, "conversation_email")
+        Tapgladly(config=config, catalog=catalog, parse_env_config=False).sync_all()
+        with open(server.files_dir / "conversation_items.jsonl") as items:
+            email_rows = sum(1 for line in items if '"type": "EMAIL"' in line)
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    types = [message["type"] for message in messages]
+    batches = [message for message in messages if message["type"] == "BATCH"]
+    assert "RECORD" not in types
+    assert types[-1] == "STATE"
+    rows = []
+    for batch in batches:
+        assert batch["stream"] == "conversation_email"
+        assert batch["encoding"] == {"format": "jsonl", "compression": "gzip"}
+        path = batch["manifest"][0].replace("file://", "")
+        with gzip.open(path, "rt") as batch_file:
+            rows.extend(json.loads(line) for line in batch_file)
+    assert len(rows) == 2 * email_rows
+    assert all(row["content"]["type"] == "EMAIL" for row in rows)
+
+
+def test_dedup_drops_rows_of_overlapping_jobs(tmp_path, capsys):
+    with MockGladlyServer(jobs=2, conversation_items_mb=0.1, topics=50) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+            dedup_path=str(tmp_path / "dedup.sqlite"),
+        )
+        catalog = selected_catalog(config, "topics", "conversation_email")
+        with open(server.files_dir / "conversation_items.jsonl") as items:
+            email_rows = sum(1 for line in items if '"type": "EMAIL"' in line)
+
+        record_counts = []
+        # The second run starts from an empty state, with the same dedup index
+        for _ in range(2):
+            Tapgladly(config=config, catalog=catalog, parse_env_config=False).sync_all()
+            messages = [
+                json.loads(line) for line in capsys.readouterr().out.splitlines()
+            ]
+            records = [message for message in messages if message["type"] == "RECORD"]
+            record_counts.append(len(records))
+            ids = [(record["stream"], record["record"]["id"]) for record in records]
+            assert len(ids) == len(set(ids))
+
+    assert record_counts == [email_rows + 50, 0]
+
+
+def test_dedup_index_keeps_committed_keys(tmp_path):
+    index = DedupIndex(tmp_path / "dedup.sqlite", min_capacity=10)
+    assert all(index.add("topics", f"topic-{key}") for key in range(100))
+    assert not index.add("topics", "topic-1")
+    assert index.add("conversation_email", "topic-1")
+    index.commit()
+    assert index.add("topics", "topic-100")
+    index.close()
+
+    index = DedupIndex(tmp_path / "dedup.sqlite", min_capacity=10)
+    assert not any(index.add("topics", f"topic-{key}") for key in range(100))
+    # Keys added after the last commit were not saved
+    assert index.add("topics", "topic-100")
+
+
+def test_shards_sync_each_job_once(capsys):
+    with MockGladlyServer(jobs=6, conversation_items_mb=0.01, topics=5) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+        )
+        catalog = selected_catalog(config, "jobs", "topics")
+        report_windows = []
+        job_ids = []
+        states = []
+        for shard_index in range(3):
+            shard_config = dict(config, shard_index=shard_index, shard_count=3)
+            tap = Tapgladly(
+                config=shard_config, catalog=catalog, parse_env_config=False
+            )
+            report_windows += tap.streams[
+                "reports__conversation_timestamps_report"
+            ].partitions
+            tap.sync_all()
+            messages = [
+                json.loads(line) for line in capsys.readouterr().out.splitlines()
+            ]
+            job_ids += [
+                message["record"]["id"]
+                for message in messages
+                if message["type"] == "RECORD" and message["stream"] == "jobs"
+            ]
+            states.append([m for m in messages if m["type"] == "STATE"][-1]["value"])
+
+    all_jobs = sorted(f"job-{index}" for index in range(6))
+    assert sorted(job_ids) == all_jobs
+    tap = Tapgladly(config=config, parse_env_config=False)
+    assert sorted(report_windows, key=lambda window: window["startAt"]) == (
+        tap.streams["reports__conversation_timestamps_report"].partitions
+    )
+    merged = merge_states(states)["bookmarks"]
+    assert sorted(merged["jobs"]["known_jobs"]["jobs"]) == all_jobs
+    assert merged["jobs"]["replication_key_value"] == min(
+        (state["bookmarks"]["jobs"]["replication_key_value"] for state in states),
+        key=to_epoch,
+    )
+    assert (
+        sorted(
+            partition["context"]["job_id"]
+            for partition in merged["topics"]["partitions"]
+            if partition.get("synced")
+        )
+        == all_jobs
+    )
+
+
+def test_merged_bookmark_is_unset_if_a_shard_has_none():
+    synced = {
+        "bookmarks": {
+            "jobs": {
+                "replication_key": "updatedAt",
+                "replication_key_value": "2022-03-02T00:00:00Z",
+                "known_jobs": {
+                    "streams": ["topics"],
+                    "jobs": {"job-1": "2022-03-02T00:00:00Z"},
+                },
+            }
+        }
+    }
+    # The first sync of the other shard stopped before the end of the job list
+    interrupted = {
+        "bookmarks": {
+            "jobs": {
+                "progress_markers": {
+                    "Note": "Progress is not resumable if interrupted.",
+                    "replication_key": "updatedAt",
+                    "replication_key_value": "2022-03-01T00:00:00Z",
+                },
+                "known_jobs": {
+                    "streams": ["topics"],
+                    "jobs": {"job-0": "2022-03-01T00:00:00Z"},
+                },
+            }
+        }
+    }
+
+    for states in ([synced, interrupted], [interrupted, synced], [synced, {}]):
+        merged = merge_states(states)["bookmarks"]["jobs"]
+        assert "replication_key_value" not in merged
+    merged = merge_states([synced, interrupted])["bookmarks"]["jobs"]
+    assert sorted(merged["known_jobs"]["jobs"]) == ["job-0", "job-1"]
+    merged = merge_states([synced, synced])["bookmarks"]["jobs"]
+    assert merged["replication_key_value"] == "2022-03-02T00:00:00Z"
+
+
+def test_merged_report_bookmark_is_the_earliest():
+    def report_state(synced_until, account_synced_until):
+        stream_state = {
+            "partitions": [
+                {"context": {"account": "a"}, "syncedUntil": account_synced_until}
+            ]
+        }
+        if synced_until is not None:
+            stream_state["syncedUntil"] = synced_until
+        return {"bookmarks": {"reports__conversation_timestamps_report": stream_state}}
+
+    states = [
+        report_state("2022-01-15", "2022-01-08"),
+        report_state("2022-01-08", "2022-01-15"),
+    ]
+    merged = merge_states(states)["bookmarks"]
+    merged = merged["reports__conversation_timestamps_report"]
+    assert merged["syncedUntil"] == "2022-01-08"
+    assert merged["partitions"] == [
+        {"context": {"account": "a"}, "syncedUntil": "2022-01-08"}
+    ]
+
+    # Windows of a shard without bookmark may not be synced
+    states.append(report_state(None, "2022-01-15"))
+    merged = merge_states(states)["bookmarks"]
+    merged = merged["reports__conversation_timestamps_report"]
+    assert "syncedUntil" not in merged
+    assert merged["partitions"] == [
+        {"context": {"account": "a"}, "syncedUntil": "2022-01-08"}
+    ]
+    merged = merge_states(states + [{}])["bookmarks"]
+    merged = merged["reports__conversation_timestamps_report"]
+    assert merged["partitions"] == [{"context": {"account": "a"}}]
+
+
+def test_follow_mode_syncs_newly_completed_jobs(capsys):
+    with MockGladlyServer(jobs=2, conversation_items_mb=0.01, topics=5) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+            follow_interval=10,
+        )
+        catalog = selected_catalog(config, "jobs", "topics")
+        tap = Tapgladly(config=config, catalog=catalog, parse_env_config=False)
+        waits = []
+
+        def sleep(wait):
+            waits.append(wait)
+            if len(waits) == 2:
+                server.complete_job()
+            if len(waits) == 4:
+                raise KeyboardInterrupt
+
+        with mock.patch("tap_gladly.streams.time.sleep", side_effect=sleep):
+            tap.sync_all()
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [message for message in messages if message["type"] == "RECORD"]
+    jobs = [record["record"]["id"] for record in records if record["stream"] == "jobs"]
+    assert jobs == ["job-0", "job-1", "job-2"]
+    topics = [record for record in records if record["stream"] == "topics"]
+    assert len(topics) == 3 * 5
+    # Polling backs off until a new job is listed
+    assert waits == [10, 20, 10, 20]
+    last_state = [m for m in messages if m["type"] == "STATE"][-1]["value"]
+    assert "job-2" in last_state["bookmarks"]["jobs"]["known_jobs"]["jobs"]
+
+
+def test_accounts_are_synced_with_their_own_api_and_state(capsys):
+    with MockGladlyServer(
+        jobs=2, conversation_items_mb=0.01, topics=5, report_rows=10
+    ) as first, MockGladlyServer(
+        jobs=3, conversation_items_mb=0.01, topics=5, report_rows=10
+    ) as second:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=first.url,
+            accounts=[
+                {"name": "first"},
+                {"name": "second", "api_url_base": second.url, "username": "other"},
+            ],
+        )
+        catalog = selected_catalog(
+            config, "jobs", "topics", "reports__conversation_timestamps_report"
+        )
+        Tapgladly(config=config, catalog=catalog, parse_env_config=False).sync_all()
+        messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        state = [m for m in messages if m["type"] == "STATE"][-1]["value"]
+        Tapgladly(
+            config=config,
+            catalog=catalog,
+            state=copy.deepcopy(state),
+            parse_env_config=False,
+        ).sync_all()
+        resumed = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    records = [message for message in messages if message["type"] == "RECORD"]
+    jobs = [
+        (record["record"]["account"], record["record"]["id"])
+        for record in records
+        if record["stream"] == "jobs"
+    ]
+    assert sorted(jobs) == [
+        ("first", "job-0"),
+        ("first", "job-1"),
+        ("second", "job-0"),
+        ("second", "job-1"),
+        ("second", "job-2"),
+    ]
+    assert all("account" in record["record"] for record in records)
+    assert len([r for r in records if r["stream"] == "topics"]) == 5 * 5
+    assert {
+        account: len(
+            [
+                record
+                for record in records
+                if record["stream"] == "reports__conversation_timestamps_report"
+                and record["record"]["account"] == account
+            ]
+        )
+        for account in ("first", "second")
+    } == {"first": 10, "second": 10}
+    assert first.authorizations == {"Basic " + base64.b64encode(b"test:test").decode()}
+    assert second.authorizations == {
+        "Basic " + base64.b64encode(b"other:test").decode()
+    }
+    partitions = state["bookmarks"]["jobs"]["partitions"]
+    assert {
+        partition["context"]["account"]: sorted(partition["known_jobs"]["jobs"])
+        for partition in partitions
+    } == {"first": ["job-0", "job-1"], "second": ["job-0", "job-1", "job-2"]}
+    # The jobs synced by each account are known on the next run
+    assert not [
+        message
+        for message in resumed
+        if message["type"] == "RECORD" and message["stream"] in ("jobs", "topics")
+    ]
+
+
+def test_accounts_share_the_job_files_prefetcher(capsys):
+    with MockGladlyServer(
+        jobs=2, conversation_items_mb=0.01, topics=5
+    ) as first, MockGladlyServer(
+        jobs=3, conversation_items_mb=0.01, topics=5
+    ) as second:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=first.url,
+            max_parallel_jobs=4,
+            accounts=[
+                {"name": "first"},
+                {"name": "second", "api_url_base": second.url},
+            ],
+        )
+        catalog = selected_catalog(config, "topics")
+        second_requests_at_first_record = []
+
+        def write_record_message(stream, record):
+            if not second_requests_at_first_record:
+                second_requests_at_first_record.extend(second.requests)
+
+        with mock.patch(
+            "tap_gladly.streams.Prefetcher", wraps=Prefetcher
+        ) as prefetcher, mock.patch.object(
+            ExportFileTopicsStream,
+            "_write_record_message",
+            autospec=True,
+            side_effect=write_record_message,
+        ) as written:
+            Tapgladly(config=config, catalog=catalog, parse_env_config=False).sync_all()
+
+    assert prefetcher.call_count == 1
+    assert written.call_count == 5 * 5
+    # The jobs of the second account are listed before the first one is synced
+    assert ("GET", "/export/jobs?status=COMPLETED") in second_requests_at_first_record
+    assert sorted(path for _, path in second.requests if "/files/" in path) == [
+        f"/export/jobs/job-{index}/files/topics.jsonl" for index in range(3)
+    ]
+
+
+def test_large_contents_are_offloaded(tmp_path, capsys):
+    with MockGladlyServer(jobs=1, conversation_items_mb=0.05) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+            offload_dir=str(tmp_path),
+            offload_threshold_bytes=1000,
+        )
+        catalog = selected_catalog(
+            config, "conversation_email", "conversation_chat_message"
+        )
+        Tapgladly(config=config, catalog=catalog, parse_env_config=False).sync_all()
+        with open(server.files_dir / "conversation_items.jsonl") as items:
+            contents = {row["id"]: row["content"] for row in map(json.loads, items)}
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    schemas = {m["stream"]: m["schema"] for m in messages if m["type"] == "SCHEMA"}
+    assert "content_ref" in schemas["conversation_email"]["properties"]
+    assert schemas["conversation_email"]["properties"]["content"]["required"] == [
+        "type"
+    ]
+    records = [message for message in messages if message["type"] == "RECORD"]
+    emails = [r["record"] for r in records if r["stream"] == "conversation_email"]
+    chats = [r["record"] for r in records if r["stream"] == "conversation_chat_message"]
+    assert emails and chats
+    assert all(chat["content"] == contents[chat["id"]] for chat in chats)
+    for email in emails:
+        assert email["content"] == {"type": "EMAIL"}
+        path = email["content_ref"]["uri"].replace("file://", "")
+        with gzip.open(path) as side_file:
+            data = side_file.read()
+        assert hashlib.sha256(data).hexdigest() == email["content_ref"]["sha256"]
+        assert json.loads(data) == contents[email["id"]]
+
+
+def test_profile_dir(tmp_path):
+    sigprof_handler = signal.getsignal(signal.SIGPROF)
+    with MockGladlyServer(jobs=1, conversation_items_mb=0.1) as server:
+        config = dict(
+            SAMPLE_CONFIG,
+            start_date=pendulum.now().subtract(days=3).isoformat(),
+            api_url_base=server.url,
+            profile_dir=str(tmp_path),
+        )
+        catalog = selected_catalog(config, "topics", "conversation_email")
+        Tapgladly(config=config, catalog=catalog, parse_env_config=False).sync_all()
+
+    assert signal.getsignal(signal.SIGPROF) == sigprof_handler
+    assert sorted(path.name for path in tmp_path.glob("*.pstats")) == [
+        "conversation_items.pstats",
+        "jobs.pstats",
+        "topics.pstats",
+    ]
+    stats = pstats.Stats(str(tmp_path / "conversation_items.pstats"))
+    functions = {function for _, _, function in stats.stats}  # type: ignore
+    assert "decode_records" in functions
+    for name in ("stages.json", "cpu.collapsed", "alloc.collapsed"):
+        assert (tmp_path / name).is_file()
+
+
+def test_parquet_batch_file(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    schema = {
+        "properties": {
+            "id": {"type": "string"},
+            "count": {"type": ["integer", "null"]},
+            "content": {
+                "type": "object",
+                "properties": {"type": {"type": "string"}, "any": {}},
+            },
+            "tags": {"type": "array", "items": {"type": "string"}},
+        }
+    }
+    batch_file = ParquetBatchFile(
+        tmp_path / "batch.parquet", BatchConfig(format="parquet"), schema
+    )
+    batch_file.write({"id": "1", "count": 2, "content": {"type": "EMAIL"}})
+    batch_file.write(
+        {"id": "2", "content": {"type": "SMS", "any": {"a": 1}}, "tags": ["x"]}
+    )
+    batch_file.close()
+
+    assert pq.read_table(tmp_path / "batch.parquet").to_pylist() == [
+        {
+            "id": "1",
+            "count": 2,
+            "content": {"type": "EMAIL", "any": None},
+            "tags": None,
+        },
+        {
+            "id": "2",
+            "count": None,
+            "content": {"type": "SMS", "any": '{"a": 1}'},
+            "tags": ["x"],
+        },
+    ]
+
+
+def test_conversation_items_streams_from_schema_files(tmp_path):
+    tap_gladly = Tapgladly(
+        config=dict(SAMPLE_CONFIG, start_date=pendulum.now().isoformat()),
+        parse_env_config=False,
+    )
+    sms_stream = tap_gladly.streams["conversation_sms"]
+    assert isinstance(sms_stream, ExportFileConversationItemsSms)
+    assert "from" in sms_stream.schema["properties"]["content"]["properties"]
+    # The schema files are parsed once, for all the taps
+    other_tap = Tapgladly(config=dict(tap_gladly.config), parse_env_config=False)
+    assert other_tap.streams["conversation_sms"].schema is sms_stream.schema
+
+    (tmp_path / "export_conversation-all_types.json").write_text("{}")
+    (tmp_path / "export_conversation-sms.json").write_text("{}")
+    (tmp_path / "export_conversation-new_channel.json").write_text("{}")
+    with mock.patch("tap_gladly.streams.SCHEMAS_DIR", tmp_path):
+        assert conversation_content_types() == ["new_channel", "sms"]
+    stream_type = conversation_items_stream_type("new_channel")
+    assert stream_type.__name__ == "ExportFileConversationItemsNewChannel"
+    assert stream_type.name == "conversation_new_channel"
+    assert stream_type.schema_file == "export_conversation-new_channel.json"
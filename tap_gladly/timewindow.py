@@ -0,0 +1,80 @@
+"""Time windows of the sync, parsed once and compared as epoch microseconds."""
+import calendar
+from datetime import date, datetime, timezone
+from typing import NamedTuple, Optional, Union, cast
+
+import pendulum
+
+DAY = 24 * 3600 * 1_000_000
+
+
+def to_epoch(value: Union[str, datetime]) -> int:
+    """Return the epoch microseconds of an ISO 8601 timestamp.
+
+    The RFC 3339 timestamps of the API are parsed by `datetime.fromisoformat`,
+    other formats by `pendulum.parse`. Timestamps without time zone are UTC,
+    like with `pendulum.parse`.
+    """
+    if isinstance(value, str):
+        try:
+            timestamp = datetime.fromisoformat(
+                value[:-1] + "+00:00" if value.endswith("Z") else value
+            )
+        except ValueError:
+            timestamp = cast(datetime, pendulum.parse(value))
+    else:
+        timestamp = value
+    # Naive timestamps are kept as they are by utctimetuple
+    seconds = calendar.timegm(timestamp.utctimetuple())
+    return seconds * 1_000_000 + timestamp.microsecond
+
+
+def now_epoch() -> int:
+    """Return the current epoch microseconds."""
+    return to_epoch(datetime.now(timezone.utc))
+
+
+def epoch_date(epoch: int) -> date:
+    """Return the UTC date of epoch microseconds."""
+    return datetime.fromtimestamp(epoch // 1_000_000, timezone.utc).date()
+
+
+class TimeWindow(NamedTuple):
+    """Timestamps from `start` to `end` included, in epoch microseconds.
+
+    A bound which is None is open.
+    """
+
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+    @classmethod
+    def parse(
+        cls, start: Optional[str] = None, end: Optional[str] = None
+    ) -> "TimeWindow":
+        """Return the window between two ISO 8601 timestamps."""
+        return cls(
+            to_epoch(start) if start else None,
+            to_epoch(end) if end else None,
+        )
+
+    def __contains__(self, timestamp: object) -> bool:
+        """Return True if the ISO 8601 or epoch `timestamp` is in the window."""
+        epoch = timestamp if isinstance(timestamp, int) else to_epoch(str(timestamp))
+        return (self.start is None or self.start <= epoch) and (
+            self.end is None or epoch <= self.end
+        )
+
+    def is_before(self, timestamp: Union[str, int]) -> bool:
+        """Return True if the timestamp is before the start of the window."""
+        epoch = timestamp if isinstance(timestamp, int) else to_epoch(timestamp)
+        return self.start is not None and epoch < self.start
+
+
+def lookback_window(max_days: int, now: Optional[int] = None) -> TimeWindow:
+    """Return the window of the timestamps less than `max_days` + 1 days ago.
+
+    Their age in whole days is at most `max_days`.
+    """
+    now = now_epoch() if now is None else now
+    return TimeWindow(start=now - (max_days + 1) * DAY + 1)